@@ -0,0 +1,744 @@
+# Import necessary libraries
+import json
+import os
+import random
+import re
+import resource
+import shutil
+import sys
+import threading
+import time
+from email.utils import parsedate_to_datetime
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+import requests
+import urllib3
+import pandas as pd
+import pyarrow as pa
+import pyarrow.csv as pa_csv
+from requests.adapters import HTTPAdapter
+
+import camis_index
+import feature_store
+import prepare
+import snapshot
+
+# ----------------------------------------------------------------------------------------------------------
+# NYC Open Data API
+# This script defines functions to retrieve and process health inspection data from the NYC Open Data API.
+# __________________________________________________________________________________________________________
+
+# Base URL for the DOHMH restaurant inspection results dataset
+BASE_URL = 'https://data.cityofnewyork.us/resource/43nn-pn8j.json'
+
+# Number of rows requested per page, and the most a single Socrata request may return
+PAGE_SIZE = 1000
+MAX_PAGE_SIZE = 50_000
+
+# Stable, unique row key used for keyset pagination (the Socrata row identifier)
+KEY_COLUMN = ':id'
+
+# Format pages are fetched in. 'csv' streams each response body from the socket straight into typed columns;
+# 'json' parses the whole body into a list of row dicts first and builds the columns from those.
+PAGE_FORMAT = os.environ.get('SOCRATA_PAGE_FORMAT', 'csv')
+
+# Arrow types CSV pages are parsed into: text columns as strings, numbers as floats (nullable integers are
+# narrowed later by snapshot.coerce_to_schema) and dates as timestamps
+CSV_TYPES = {KEY_COLUMN: pa.string()}
+for column, dtype in snapshot.SCHEMA.items():
+    CSV_TYPES[column] = (pa.timestamp('us') if dtype.startswith('datetime')
+                         else pa.string() if dtype in ('category', 'string') else pa.float64())
+
+# Columns that identify a single violation row when merging incremental updates
+MERGE_KEYS = ['camis', 'inspection_date', 'violation_code']
+
+# Status codes worth retrying: throttling and transient server errors
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# Retry budget per request, and the base and cap of the exponential backoff, in seconds
+MAX_RETRIES = 6
+BACKOFF_BASE = 1.0
+BACKOFF_CAP = 60.0
+
+# Seconds to wait for the server before treating a request as failed
+REQUEST_TIMEOUT = 60
+
+# Request rate budget. Socrata throttles per app token; staying at a few requests per second (with a small
+# burst for concurrent fetching) keeps long pulls well under the throttling threshold.
+REQUESTS_PER_SECOND = float(os.environ.get('SOCRATA_REQUESTS_PER_SECOND', 4))
+REQUEST_BURST = int(os.environ.get('SOCRATA_REQUEST_BURST', 8))
+
+# Error raised when a request fails for good, keeping the status code for callers.
+class APIRequestError(Exception):
+    def __init__(self, status_code):
+        super().__init__(f"Failed to retrieve data. Status code: {status_code}")
+        self.status_code = status_code
+
+# Class implementing a thread-safe token bucket: `rate` tokens are added per second up to `capacity`,
+# and every request takes one, waiting for a token if the bucket is empty.
+class TokenBucket:
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait_time = (1 - self.tokens) / self.rate
+            time.sleep(wait_time)
+
+# Limiter shared by every request of the process, so concurrent workers draw from the same budget
+RATE_LIMITER = TokenBucket(REQUESTS_PER_SECOND, REQUEST_BURST)
+
+# Function to compute the delay before a retry: exponential backoff with full jitter.
+def backoff_delay(attempt):
+    return random.uniform(0, min(BACKOFF_CAP, BACKOFF_BASE * 2 ** attempt))
+
+# Function to read a Retry-After header (seconds or an HTTP date) as a number of seconds, if present.
+def retry_after_seconds(response):
+    value = response.headers.get('Retry-After')
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        try:
+            return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+        except (TypeError, ValueError):
+            return None
+
+# Errors that mean the connection broke or stalled, before the response or part way through its body
+TRANSIENT_ERRORS = (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError,
+                    urllib3.exceptions.ProtocolError, urllib3.exceptions.ReadTimeoutError)
+
+# Function to GET a URL with query `params` (URL-encoded by requests) under the rate limit and return its body
+# as read by `read` (a function of the response), retrying throttled, failed and timed-out requests. The body is
+# read inside the retry loop, so a connection that breaks or stalls part way through it is retried too.
+# Throttled responses wait as long as Retry-After asks; everything else backs off exponentially. Every
+# response is closed before the next attempt.
+def get_with_retry(url, read, session=None, stream=False, params=None):
+    for attempt in range(MAX_RETRIES + 1):
+        RATE_LIMITER.acquire()
+        try:
+            with (session or requests).get(url, params=params, timeout=REQUEST_TIMEOUT, stream=stream) as response:
+                if response.status_code == 200:
+                    return read(response)
+                if response.status_code not in RETRY_STATUSES or attempt == MAX_RETRIES:
+                    raise APIRequestError(response.status_code)
+                delay = retry_after_seconds(response)
+        except TRANSIENT_ERRORS:
+            if attempt == MAX_RETRIES:
+                raise
+            delay = None
+        if delay is None:
+            delay = backoff_delay(attempt)
+        time.sleep(delay)
+
+# Function to parse a CSV page from a file-like object into typed columns, without building row objects.
+# Arrow's streaming reader pulls the body in blocks and converts each block straight into column buffers;
+# empty fields (how the CSV endpoint writes nulls) become nulls.
+def read_csv_page(stream):
+    options = pa_csv.ConvertOptions(column_types=CSV_TYPES, strings_can_be_null=True)
+    return pa_csv.open_csv(stream, convert_options=options).read_all().to_pandas()
+
+# Function to parse a streamed CSV response as it arrives.
+def read_csv_response(response):
+    response.raw.decode_content = True
+    return read_csv_page(response.raw)
+
+# Function to make an API request to NYC Open Data and retrieve one page of inspection data for a specified
+# year range, as a DataFrame.
+def make_api_request(start_year, end_year, app_token, offset, page_size, session=None, base_url=None, order=None, where=None,
+                     select=None, page_format=None):
+    # Build the row filter, narrowing the year range further if an extra condition is given
+    where_clause = f'inspection_date between "{start_year}-01-01T00:00:00.000" and "{end_year}-12-31T23:59:59.999"'
+    if where:
+        where_clause = f'{where_clause} and ({where})'
+
+    # The dataset's CSV endpoint has the same path with a .csv extension
+    page_format = page_format or PAGE_FORMAT
+    base_url = base_url or BASE_URL
+    if page_format == 'csv':
+        base_url = base_url.removesuffix('.json') + '.csv'
+
+    # Construct the query with filters, app token, offset, and page size. The values are passed to requests to be
+    # URL-encoded, since filter literals may contain characters such as '&', '#' or '+'
+    params = {'$where': where_clause, '$$app_token': app_token, '$offset': offset, '$limit': page_size}
+
+    # A stable sort order is required when pages are fetched out of sequence
+    if order:
+        params['$order'] = order
+
+    # System fields such as :id are only returned when selected explicitly
+    if select:
+        params['$select'] = select
+
+    # Make an HTTP GET request to the API, reusing the pooled session's connections if one is given.
+    # Throttling, server errors, timeouts and broken bodies are retried; anything else raises APIRequestError.
+    if page_format == 'csv':
+        # The body is parsed as it streams in, so it is never held in memory as a whole
+        return get_with_retry(base_url, read_csv_response, session, stream=True, params=params)
+
+    # Return the response data in JSON format, as columns
+    return get_with_retry(base_url, lambda response: pd.DataFrame(response.json()), session, params=params)
+
+# Operators accepted in structured filters. Each filter is a (column, operator, value) tuple; 'in', 'not in',
+# 'starts with' and 'not starts with' take a list of values (or a single string, meaning that one value).
+FILTER_OPERATORS = ('=', '!=', '<', '<=', '>', '>=', 'in', 'not in', 'starts with', 'not starts with')
+
+# Function to write a Python value as a SoQL literal.
+def soql_literal(value):
+    # Booleans are lower case in SoQL (str() would give 'True'), numpy booleans included
+    if pd.api.types.is_bool(value):
+        return 'true' if value else 'false'
+    if isinstance(value, pd.Timestamp):
+        value = value.strftime('%Y-%m-%dT%H:%M:%S.000')
+    if isinstance(value, str):
+        return "'" + value.replace("'", "''") + "'"
+    return str(value)
+
+# Function to translate structured filters into a SoQL $where clause (the filters are ANDed together).
+# Negated filters keep rows where the column is null, matching how the prepare steps treat missing values.
+def build_where(filters):
+    clauses = []
+    for column, operator, value in filters:
+        if operator not in FILTER_OPERATORS:
+            raise ValueError(f"Unsupported filter operator: {operator}")
+
+        values = [value] if isinstance(value, str) else value
+        if operator in ('in', 'not in'):
+            clause = f'{column} in ({", ".join(soql_literal(v) for v in values)})'
+        elif operator in ('starts with', 'not starts with'):
+            clause = ' or '.join(f'starts_with({column}, {soql_literal(v)})' for v in values)
+        else:
+            clause = f'{column} {"=" if operator == "!=" else operator} {soql_literal(value)}'
+
+        if operator in ('!=', 'not in', 'not starts with'):
+            clause = f'{column} is null or not ({clause})'
+        clauses.append(f'({clause})')
+    return ' and '.join(clauses) or None
+
+# Function to apply the same structured filters to a frame already in memory, returning a boolean mask.
+def filter_mask(df, filters):
+    mask = pd.Series(True, index=df.index)
+    for column, operator, value in filters:
+        series = df[column]
+        if operator in ('in', 'not in'):
+            # A single string is one value, as in build_where, not a list of characters
+            match = series.isin([value] if isinstance(value, str) else list(value))
+        elif operator in ('starts with', 'not starts with'):
+            match = prepare.starts_with(series, value if isinstance(value, str) else tuple(value))
+        else:
+            if pd.api.types.is_datetime64_any_dtype(series.dtype):
+                value = pd.Timestamp(value)
+            compare = {'=': series.eq, '!=': series.eq, '<': series.lt, '<=': series.le, '>': series.gt, '>=': series.ge}
+            match = compare[operator](value).fillna(False).astype(bool)
+        mask &= ~match if operator in ('!=', 'not in', 'not starts with') else match
+    return mask
+
+# Function to build the $select list for a column list. The columns that year partitions, sync high-water marks
+# and filters are derived from are always fetched, whether or not they were asked for.
+def build_select(columns, by_boro=False, filters=None):
+    if not columns:
+        return None
+    required = ['inspection_date', 'record_date'] + (['boro'] if by_boro else []) + [f[0] for f in filters or []]
+    return ','.join(list(columns) + [column for column in required if column not in columns])
+
+# Function to check whether a stored year was fetched with a pushdown that covers a request: it holds every
+# requested column and either was not filtered or was filtered exactly as requested.
+def pushdown_covers(entry, select, where):
+    stored_select, stored_where = entry.get('select'), entry.get('where')
+    if stored_where is not None and stored_where != where:
+        return False
+    return stored_select is None or (select is not None and set(select.split(',')) <= set(stored_select.split(',')))
+
+# Function to create a keep-alive HTTP session whose connection pool matches the number of workers.
+def make_session(pool_size=1):
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+# Name of the file that records the settings of the run a page checkpoint belongs to
+CHECKPOINT_RUN = '_run.json'
+
+# Function to open a page checkpoint directory for a run, given the settings that decide which pages it saves
+# and how they are named (pagination mode, page size, pushdown). Pages saved by a run with other settings (or
+# by a version that did not record them) cannot be reused, so they are discarded. Returns the names of the
+# saved pages to resume from, in order.
+def open_checkpoint(checkpoint, run):
+    path = os.path.join(checkpoint, CHECKPOINT_RUN)
+    if os.path.isdir(checkpoint):
+        saved = None
+        if os.path.isfile(path):
+            with open(path) as f:
+                saved = json.load(f)
+        if saved == run:
+            return sorted(name for name in os.listdir(checkpoint) if name.startswith('page-'))
+        print(f"Discarding {checkpoint}: its pages were saved by a run with other settings.")
+        shutil.rmtree(checkpoint)
+
+    os.makedirs(checkpoint)
+    with open(path, 'w') as f:
+        json.dump(run, f)
+    return []
+
+# Function to fetch pages concurrently with a bounded pool of workers, returning one frame in offset order.
+# With a checkpoint directory, every completed page is saved there under its offset and size as it arrives;
+# calling again with the same directory reuses the saved pages and fetches only the others.
+def fetch_pages_concurrently(start_year, end_year, app_token, max_observations=None, concurrency=4, page_size=PAGE_SIZE, base_url=None, where=None,
+                             select=None, checkpoint=None):
+    if concurrency < 1:
+        raise ValueError("Concurrency must be at least 1")
+    if not 1 <= page_size <= MAX_PAGE_SIZE:
+        raise ValueError(f"Page size must be between 1 and {MAX_PAGE_SIZE}")
+
+    session = make_session(concurrency)
+    pages = {}
+    in_flight = {}
+    next_offset = 0
+    last_offset = None  # Offset of the first empty or short page, once seen
+
+    # Function to work out the size of the page at an offset, honouring max_observations.
+    def page_limit(offset):
+        if max_observations is None:
+            return page_size
+        return min(page_size, max_observations - offset)
+
+    # Pages saved by an earlier, failed run
+    if checkpoint:
+        saved = open_checkpoint(checkpoint, {'mode': 'concurrent', 'page_size': page_size, 'where': where,
+                                             'select': select})
+        # A saved page is only reused by a run that asks for the same page at its offset
+        for name in saved:
+            offset, limit = map(int, name[len('page-'):-len('.parquet')].split('-'))
+            if page_limit(offset) == limit:
+                pages[offset] = pd.read_parquet(os.path.join(checkpoint, name))
+        if saved:
+            print(f"Resuming with {sum(len(page) for page in pages.values())} rows from {checkpoint}.")
+
+    with session, ThreadPoolExecutor(max_workers=concurrency) as executor:
+        # Keep up to `concurrency` requests in flight, topping the pipeline up as each one completes
+        while True:
+            # Saved pages are reused instead of fetched (a saved short page ends the data)
+            while last_offset is None and page_limit(next_offset) > 0 and next_offset in pages:
+                if len(pages[next_offset]) < page_limit(next_offset):
+                    last_offset = next_offset
+                next_offset += page_limit(next_offset)
+
+            while len(in_flight) < concurrency and last_offset is None and page_limit(next_offset) > 0:
+                future = executor.submit(make_api_request, start_year, end_year, app_token, next_offset,
+                                         page_limit(next_offset), session, base_url, ':id', where, select)
+                in_flight[future] = next_offset
+                next_offset += page_limit(next_offset)
+                while (page_limit(next_offset) > 0 and next_offset in pages
+                       and len(pages[next_offset]) == page_limit(next_offset)):
+                    next_offset += page_limit(next_offset)
+
+            if not in_flight:
+                break
+
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                offset = in_flight.pop(future)
+                data = future.result()
+                pages[offset] = data
+                if checkpoint:
+                    data.to_parquet(os.path.join(checkpoint, f'page-{offset:012d}-{page_limit(offset):06d}.parquet'),
+                                    index=False)
+
+                # An empty or short page marks the end of the data; nothing past it is requested
+                if len(data) < page_limit(offset) and (last_offset is None or offset < last_offset):
+                    last_offset = offset
+
+            # Requests beyond the end of the data are cancelled if they have not started yet
+            if last_offset is not None:
+                for future, offset in list(in_flight.items()):
+                    if offset > last_offset and future.cancel():
+                        in_flight.pop(future)
+
+    # The run completed, so its checkpoint is no longer needed
+    if checkpoint:
+        shutil.rmtree(checkpoint)
+
+    # Stitch the pages back together in offset order, stopping at the first empty page
+    offsets, offset = [], 0
+    while offset < next_offset and (last_offset is None or offset <= last_offset):
+        offsets.append(offset)
+        offset += page_limit(offset)
+    return concat_pages([pages[offset] for offset in offsets])
+
+# Function to combine page frames into one frame, without the row ids used for paging.
+def concat_pages(pages):
+    pages = [page for page in pages if len(page)]
+    if not pages:
+        return pd.DataFrame()
+    return pd.concat(pages, ignore_index=True).drop(columns=[KEY_COLUMN], errors='ignore')
+
+# Function to yield pages of rows one at a time until the end of the data, ordered by row id.
+# In keyset mode each page asks for rows whose id is greater than the last one seen (`$where :id > last`),
+# so every request costs the same however deep into the data it is, and rows added or removed mid-pull cannot
+# shift later pages. In offset mode pages are walked with $offset. Pages are DataFrames and carry their :id
+# column in keyset mode; a run can be resumed after a failure from `start_after` (keyset) or `start_offset`.
+def iter_pages(start_year, end_year, app_token, max_observations=None, where=None, start_offset=0, start_after=None,
+               page_size=PAGE_SIZE, keyset=True, select=None):
+    if not 1 <= page_size <= MAX_PAGE_SIZE:
+        raise ValueError(f"Page size must be between 1 and {MAX_PAGE_SIZE}")
+
+    offset = 0 if keyset else start_offset
+    last_key = start_after
+    fetched = start_offset
+
+    # Continue making API requests until reaching the specified number of observations or the end of data.
+    while max_observations is None or fetched < max_observations:
+        remaining_observations = max_observations - fetched if max_observations is not None else page_size
+        actual_page_size = min(page_size, remaining_observations)
+
+        if keyset:
+            page_where = f'{KEY_COLUMN} > "{last_key}"' if last_key is not None else None
+            if where:
+                page_where = f'({where}) and {page_where}' if page_where else where
+            data = make_api_request(start_year, end_year, app_token, 0, actual_page_size, order=KEY_COLUMN,
+                                    where=page_where, select=f'{KEY_COLUMN},{select or "*"}')
+        else:
+            data = make_api_request(start_year, end_year, app_token, offset, actual_page_size, order=KEY_COLUMN, where=where,
+                                    select=select)
+
+        # Stop if no more data is available
+        if data.empty:
+            break
+
+        yield data
+        fetched += len(data)
+        offset += actual_page_size
+        if keyset:
+            last_key = data[KEY_COLUMN].iloc[-1]
+
+        # A short page is the last one
+        if len(data) < actual_page_size:
+            break
+
+# Function to process data by making API requests and accumulating the results.
+# With a checkpoint directory, every completed page is saved there as a Parquet file as it arrives; if the run
+# fails, calling again with the same directory and settings reloads those pages and carries on from the next
+# page. Sequential and concurrent runs save different pages, so a checkpoint is only resumed in its own mode.
+# Sequential pulls use keyset pagination unless keyset=False; concurrent pulls fetch pages by offset.
+def process_data(start_year, end_year, app_token, max_observations=None, concurrency=1, where=None, checkpoint=None,
+                 page_size=PAGE_SIZE, keyset=True, select=None):
+    # Fetch pages in parallel over a pooled session when more than one worker is requested
+    if concurrency > 1:
+        return fetch_pages_concurrently(start_year, end_year, app_token, max_observations, concurrency, page_size,
+                                        where=where, select=select, checkpoint=checkpoint)
+
+    # Accumulate the retrieved pages, starting with any pages saved by an earlier, failed run
+    pages = []
+    if checkpoint:
+        saved = open_checkpoint(checkpoint, {'mode': 'sequential', 'keyset': keyset, 'page_size': page_size,
+                                             'where': where, 'select': select})
+        pages = [pd.read_parquet(os.path.join(checkpoint, name)) for name in saved]
+        if pages:
+            print(f"Resuming from offset {sum(len(page) for page in pages)} using {checkpoint}.")
+
+    start_after = pages[-1][KEY_COLUMN].iloc[-1] if pages and KEY_COLUMN in pages[-1] else None
+    for data in iter_pages(start_year, end_year, app_token, max_observations, where, start_offset=sum(map(len, pages)),
+                           start_after=start_after, page_size=page_size, keyset=keyset, select=select):
+        if checkpoint:
+            data.to_parquet(os.path.join(checkpoint, f'page-{len(pages):06d}.parquet'), index=False)
+        pages.append(data)
+
+    # The run completed, so its checkpoint is no longer needed
+    if checkpoint:
+        shutil.rmtree(checkpoint)
+
+    # Combine the pages into one DataFrame
+    return concat_pages(pages)
+
+# Function to report the process's peak resident memory so far, in megabytes.
+def peak_memory_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss is reported in bytes on macOS and in kilobytes elsewhere
+    return peak / (1024 * 1024) if sys.platform == 'darwin' else peak / 1024
+
+# Function to stream a year range from the API straight into the snapshot store in fixed memory.
+# Each page is turned into a columnar frame as it arrives, and every `batch_rows` rows are typed and written as
+# new part files of their year partitions, so no more than one batch is held at a time.
+# After each batch is written, the offset reached is checkpointed in the dataset root; if the run fails, calling
+# it again with the same arguments keeps the batches already written and resumes from that offset.
+def ingest_health_inspection_data(start_year, end_year, app_token, root=snapshot.DATASET_ROOT, by_boro=False,
+                                  batch_rows=50_000, where=None, page_size=PAGE_SIZE, keyset=True, select=None):
+    years = range(start_year, end_year + 1)
+    checkpoint_path = os.path.join(root, '_ingest_checkpoint.json')
+    run = {'start_year': start_year, 'end_year': end_year, 'where': where, 'select': select, 'by_boro': by_boro,
+           'keyset': keyset}
+
+    checkpoint = None
+    if os.path.isfile(checkpoint_path):
+        with open(checkpoint_path) as f:
+            checkpoint = json.load(f)
+        if checkpoint['run'] != run:
+            checkpoint = None
+
+    if checkpoint:
+        # Part files past the checkpoint belong to a batch that was cut short, so they are rewritten
+        offset, last_key, part = checkpoint['offset'], checkpoint['after'], checkpoint['part']
+        stats = {int(year): {'rows': s['rows'], 'record_date': pd.Timestamp(s['record_date']),
+                             'inspection_date': pd.Timestamp(s['inspection_date'])}
+                 for year, s in checkpoint['stats'].items()}
+        for year in years:
+            for directory, _, files in os.walk(os.path.join(root, f'{snapshot.YEAR_COLUMN}={year}')):
+                for name in files:
+                    if name.startswith('part-') and int(name[5:10]) >= part:
+                        os.remove(os.path.join(directory, name))
+        print(f"Resuming ingestion from row {offset} using {checkpoint_path}.")
+    else:
+        # The years stop counting as stored before their files are cleared, so a run cut short (and later
+        # discarded) never leaves the manifest claiming partial data
+        snapshot.forget_years(years, root)
+        for year in years:
+            snapshot.clear_year_partition(year, root)
+        offset, last_key, part = 0, None, 0
+        stats = {year: {'rows': 0, 'record_date': pd.NaT, 'inspection_date': pd.NaT} for year in years}
+
+    buffer, buffered, buffer_key = [], 0, last_key
+
+    # Function to write the buffered pages out as one part file per year.
+    def flush():
+        batch = snapshot.coerce_to_schema(pd.concat(buffer, ignore_index=True))
+        for year, rows in batch.groupby(batch['inspection_date'].dt.year):
+            snapshot.append_year_batch(rows, int(year), part, root, by_boro)
+            year_stats = stats[int(year)]
+            year_stats['rows'] += len(rows)
+            for column in ['record_date', 'inspection_date']:
+                year_stats[column] = pd.Series([year_stats[column], rows[column].max()]).max()
+
+    # Function to record that every row up to `offset` (and row id `last_key`) is safely written.
+    def save_checkpoint():
+        os.makedirs(root, exist_ok=True)
+        state = {str(year): {'rows': s['rows'],
+                             'record_date': None if pd.isna(s['record_date']) else s['record_date'].isoformat(),
+                             'inspection_date': None if pd.isna(s['inspection_date']) else s['inspection_date'].isoformat()}
+                 for year, s in stats.items()}
+        with open(checkpoint_path, 'w') as f:
+            json.dump({'run': run, 'offset': offset, 'after': last_key, 'part': part, 'stats': state}, f)
+
+    pages = iter_pages(start_year, end_year, app_token, where=where, start_offset=offset, start_after=last_key,
+                       page_size=page_size, keyset=keyset, select=select)
+    for data in pages:
+        buffer_key = data[KEY_COLUMN].iloc[-1] if KEY_COLUMN in data else None
+        buffer.append(data.drop(columns=[KEY_COLUMN], errors='ignore'))
+        buffered += len(data)
+        if buffered >= batch_rows:
+            flush()
+            offset += buffered
+            last_key = buffer_key
+            buffer, buffered, part = [], 0, part + 1
+            save_checkpoint()
+
+    if buffer:
+        flush()
+
+    # Years are only marked as stored once every batch has been written
+    for year, year_stats in stats.items():
+        snapshot.record_year(year, year_stats['rows'], year_stats['record_date'], year_stats['inspection_date'], root, by_boro,
+                             {'select': select, 'where': where})
+
+    if os.path.isfile(checkpoint_path):
+        os.remove(checkpoint_path)
+
+    print(f"Streamed {sum(s['rows'] for s in stats.values())} rows from {start_year} to {end_year} into {root} "
+          f"(peak memory {peak_memory_mb():.0f} MB).")
+    return stats
+
+# Function to group a list of years into contiguous (start, end) runs, so each run is one API pull.
+def year_runs(years):
+    runs = []
+    for year in sorted(years):
+        if runs and year == runs[-1][1] + 1:
+            runs[-1][1] = year
+        else:
+            runs.append([year, year])
+    return [tuple(run) for run in runs]
+
+# Function to merge newly fetched rows into a snapshot, replacing rows that share the same merge keys.
+# Returns the merged frame and the number of snapshot rows that were replaced.
+def merge_delta(df, delta, keys=MERGE_KEYS):
+    if delta.empty:
+        return df, 0
+
+    # Bring the fetched (all-string) columns in line with the snapshot schema
+    delta = snapshot.coerce_to_schema(delta)
+
+    # Compare keys as strings so null violation codes line up on both sides
+    existing = pd.MultiIndex.from_frame(df[keys].astype(str))
+    incoming = pd.MultiIndex.from_frame(delta[keys].astype(str))
+
+    kept = df[~existing.isin(incoming)]
+    delta = delta[~incoming.duplicated(keep='last')]
+
+    # Categories differ between the two sides, so re-apply the schema to the combined frame
+    merged = snapshot.coerce_to_schema(pd.concat([kept, delta], ignore_index=True))
+    return merged, len(df) - len(kept)
+
+# Function to bring stored years up to date by fetching only rows newer than their high-water marks.
+# Only the year partitions that received new or changed rows are rewritten. Years fetched with a $select or
+# $where pushdown are synced with the same pushdown, one pull per distinct pushdown.
+def sync_health_inspection_data(start_year, end_year, app_token, concurrency=1, root=snapshot.DATASET_ROOT):
+    manifest = snapshot.load_manifest(root)
+    stored = [year for year in range(start_year, end_year + 1) if str(year) in manifest['years']]
+    if not stored:
+        return
+
+    groups = {}
+    for year in stored:
+        entry = manifest['years'][str(year)]
+        groups.setdefault((entry.get('select'), entry.get('where')), []).append(year)
+
+    for (select, pushdown_where), years in groups.items():
+        # Each year is checked against its own high-water marks, so a year with older marks does not make the
+        # rows of every later year match again
+        conditions = []
+        for year in years:
+            marks = manifest['years'][str(year)]
+            floor = f'{year}-01-01T00:00:00.000'
+            conditions.append(f'(inspection_date between "{floor}" and "{year}-12-31T23:59:59.999" and '
+                              f'(record_date > "{marks["record_date"] or floor}" or '
+                              f'inspection_date > "{marks["inspection_date"] or floor}"))')
+
+        where = ' or '.join(conditions)
+        if pushdown_where:
+            where = f'({pushdown_where}) and ({where})'
+        delta = process_data(years[0], years[-1], app_token, concurrency=concurrency, where=where, select=select)
+        delta = snapshot.coerce_to_schema(delta)
+
+        if delta.empty:
+            print(f"Health inspection data from {years[0]} to {years[-1]} is already up to date.")
+            continue
+
+        delta_years = delta['inspection_date'].dt.year
+        for year in sorted(set(delta_years) & set(years)):
+            entry = manifest['years'][str(year)]
+            current = snapshot.read_partitions(year, year, root)
+            merged, replaced = merge_delta(current, delta[delta_years == year])
+            snapshot.write_year_partition(merged, year, root, entry.get('by_boro', False), {'select': select, 'where': pushdown_where})
+            print(f"Merged {len(merged) - len(current) + replaced} new or changed rows into {year} ({replaced} replaced).")
+
+# Names of the per-range snapshot files earlier versions kept in the working directory (Parquet, and CSV before that)
+LEGACY_SNAPSHOT = re.compile(r'nyc_health_inspections_(\d{4})(?:_to_(\d{4}))?\.(parquet|csv)')
+
+# Columns every row of a full pull carries (the API leaves out columns that are null in every row fetched)
+LEGACY_COLUMNS = MERGE_KEYS + ['dba', 'boro', 'record_date', 'inspection_type', 'action', 'score']
+
+# Function to import legacy per-range snapshot files into the year partitions, for those of `years` that are not
+# stored yet, so upgrading does not download them again. Parquet files are preferred over CSV files of the same
+# years. Files missing columns of a full pull (such as column subsets written by export_health_inspection_csv)
+# are skipped. Returns the years imported.
+def import_legacy_snapshots(years, root=snapshot.DATASET_ROOT, directory='.'):
+    imported = []
+    names = sorted((name for name in os.listdir(directory) if LEGACY_SNAPSHOT.fullmatch(name)),
+                   key=lambda name: (name.endswith('.csv'), name))
+    for name in names:
+        match = LEGACY_SNAPSHOT.fullmatch(name)
+        wanted = [year for year in range(int(match[1]), int(match[2] or match[1]) + 1)
+                  if year in years and year not in imported]
+        if not wanted:
+            continue
+
+        path = os.path.join(directory, name)
+        df = pd.read_parquet(path) if match[3] == 'parquet' else pd.read_csv(path)
+        if not set(LEGACY_COLUMNS) <= set(df.columns):
+            print(f"Skipping {name}: it is missing columns of a full pull.")
+            continue
+
+        snapshot.write_partitions(df, wanted, root)
+        imported.extend(wanted)
+        print(f"Imported {name} into {root} for {', '.join(map(str, wanted))}.")
+    return imported
+
+# Function to get health inspection data, building the requested range from stored year partitions and
+# fetching only the years that are missing.
+# `columns` and `filters` (structured (column, operator, value) tuples, see build_where) are pushed down to the
+# API as $select and $where, so unneeded columns and rows are never downloaded; prepare.SOURCE_COLUMNS and
+# prepare.SOURCE_FILTERS describe what the preparation steps keep. Stored years record the pushdown they were
+# fetched with, and a year whose stored data does not cover a request is fetched again. Years kept in a range
+# snapshot file by an earlier version are imported from it instead of fetched.
+# With stream=True missing years are ingested in fixed memory; callers that cannot hold the whole range
+# should call ingest_health_inspection_data() and read it back with snapshot.iter_partitions() instead.
+def get_health_inspection_data(start_year, end_year, app_token, max_observations=None, concurrency=1, sync=False,
+                               columns=None, boros=None, root=snapshot.DATASET_ROOT, by_boro=False, stream=False,
+                               filters=None):
+    start_year, end_year = int(start_year), int(end_year)
+
+    # Check if the end year is greater than or equal to the start year
+    if end_year < start_year:
+        raise ValueError("End year must be greater than or equal to start year")
+
+    select = build_select(columns, by_boro, filters)
+    where = build_where(filters) if filters else None
+
+    # A capped pull is a sample, not a complete year, so it is returned without being stored
+    if max_observations is not None:
+        df = process_data(start_year, end_year, app_token, max_observations, concurrency, where=where, select=select)
+        df = snapshot.coerce_to_schema(df)
+        return df[columns] if columns else df
+
+    # Pull only new or changed rows into the stored years when asked to
+    if sync:
+        sync_health_inspection_data(start_year, end_year, app_token, concurrency, root)
+
+    # Fetch the years that are not stored yet (or not stored with the requested columns and rows), one API pull
+    # per contiguous run of such years
+    manifest = snapshot.load_manifest(root)
+    missing = [year for year in range(start_year, end_year + 1)
+               if str(year) not in manifest['years'] or not pushdown_covers(manifest['years'][str(year)], select, where)]
+
+    # Years never stored may still be in a range snapshot left by an earlier version (which held every column and
+    # row, so it covers any pushdown)
+    imported = []
+    if missing:
+        imported = import_legacy_snapshots([year for year in missing if str(year) not in manifest['years']], root)
+        missing = [year for year in missing if year not in imported]
+    for run_start, run_end in year_runs(missing):
+        if stream:
+            ingest_health_inspection_data(run_start, run_end, app_token, root, by_boro, where=where, select=select)
+            continue
+
+        checkpoint = os.path.join(root, f'_checkpoint_{run_start}_{run_end}')
+        df = process_data(run_start, run_end, app_token, concurrency=concurrency, checkpoint=checkpoint, where=where,
+                          select=select)
+        snapshot.write_partitions(df, range(run_start, run_end + 1), root, by_boro, {'select': select, 'where': where})
+        print(f"Health inspection data from {run_start} to {run_end} retrieved and saved to {root}.")
+
+    # Keep the restaurant index and feature store (if the dataset has them) in step with the stored years
+    if (sync or missing or imported) and camis_index.has_index(root):
+        index = camis_index.refresh_index(root)
+        if feature_store.has_store(root):
+            feature_store.refresh_store(index, root)
+
+    # Read the requested range, skipping partitions outside it. Years stored without the filters are filtered
+    # here instead, so the result is the same either way.
+    df = snapshot.read_partitions(start_year, end_year, root, columns, boros)
+    if filters and columns:
+        # Filter columns may not be among the requested ones, so read them alongside for the mask
+        extra = [column for column, _, _ in filters if column not in columns]
+        if extra:
+            mask = filter_mask(snapshot.read_partitions(start_year, end_year, root, extra, boros), filters)
+            return df[mask.to_numpy()].reset_index(drop=True)
+    if filters:
+        df = df[filter_mask(df, filters)].reset_index(drop=True)
+    return df
+
+# Function to export a year range from the dataset to CSV.
+def export_health_inspection_csv(start_year, end_year, csv_filename=None, columns=None, root=snapshot.DATASET_ROOT):
+    csv_filename = csv_filename or (f'nyc_health_inspections_{start_year}_to_{end_year}.csv' if start_year != end_year else f'nyc_health_inspections_{start_year}.csv')
+    df = snapshot.read_partitions(int(start_year), int(end_year), root, columns)
+    return snapshot.export_csv(df, csv_filename)
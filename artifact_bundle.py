@@ -0,0 +1,28 @@
+# Import necessary libraries
+import json
+
+import pandas as pd
+
+# ----------------------------------------------------------------------------------------------------------
+# Artifact Bundle Reader
+# This module reads the artifact bundle written by artifacts.py. It only needs json and pandas, so the app can
+# load the bundle without importing the acquire and prepare code that builds it.
+# __________________________________________________________________________________________________________
+
+# Default location of the bundle
+BUNDLE_PATH = 'artifacts.json'
+
+# Function to decode an artifact back into a DataFrame or string.
+def decode(kind, data):
+    if kind == 'table':
+        return pd.DataFrame(data['data'], index=data['index'], columns=data['columns'])
+    return data
+
+# Function to read a bundle file in one read, returning its manifest and decoded artifacts.
+def load_bundle(path=BUNDLE_PATH):
+    with open(path) as f:
+        bundle = json.load(f)
+
+    bundle['artifacts'] = {name: decode(bundle['manifest'][name]['kind'], data)
+                           for name, data in bundle['data'].items()}
+    return bundle
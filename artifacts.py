@@ -0,0 +1,197 @@
+# Import necessary libraries
+import argparse
+import hashlib
+import inspect
+import json
+import os
+from datetime import datetime, timezone
+
+import pandas as pd
+
+import acquire
+import artifact_bundle
+import prepare
+import profiler
+import snapshot
+
+# ----------------------------------------------------------------------------------------------------------
+# Artifact Bundle
+# This script runs the acquire and prepare steps against the snapshot store and writes every table and
+# text block the app displays into one versioned JSON bundle. The bundle's manifest records, for each
+# artifact, a hash of its inputs (the stored years it was built from plus the code that built it) and a
+# hash of its content. Rebuilding skips artifacts whose inputs have not changed.
+# __________________________________________________________________________________________________________
+
+# Default location of the bundle (reading it lives in artifact_bundle.py, so the app need not import this module)
+BUNDLE_PATH = artifact_bundle.BUNDLE_PATH
+load_bundle = artifact_bundle.load_bundle
+
+# Version of the bundle layout (bumped only if the file structure changes)
+BUNDLE_FORMAT = 1
+
+# Number of rows shown in preview tables
+PREVIEW_ROWS = 5
+
+# Function to build the head preview of the acquired data (inspections_df_head.csv).
+def head_preview(df):
+    return df.head(PREVIEW_ROWS)
+
+# Function to build the dataset overview table (inspections_df_status.csv).
+def status_table(df):
+    return profiler.status_table(profiler.profile_chunks([df]))
+
+# Function to build the null count table (inspections_df_isna.csv).
+def null_table(df):
+    return profiler.null_table(profiler.profile_chunks([df]))
+
+# Function to build the table of columns with nulls or zeros (inspections_prepare.csv).
+def prepare_table(df):
+    return profiler.prepare_table(profiler.profile_chunks([df]))
+
+# Function to build the sorted list of inspection types, formatted like the notebook output.
+def inspection_types(df):
+    types = sorted(df['inspection_type'].dropna().unique().tolist())
+    return '\n[' + ',\n'.join(repr(t) for t in types) + ']\n'
+
+# Function to build the preview of visits with a null violation code (inspections_camisg.csv).
+def camis_null_visits(df, visits=None):
+    return prepare.visits_with_null_violations(df, visits=visits).sort_values(by='camis').head(PREVIEW_ROWS)
+
+# Function to count null scores by inspection type.
+def null_score_by_inspection_type(df):
+    return prepare.null_counts_by(df, 'inspection_type', 'score').rename('null_score').reset_index()
+
+# Function to count null violation codes by inspection type.
+def null_violation_by_inspection_type(df):
+    return prepare.null_counts_by(df, 'inspection_type', 'violation_code').rename('null_violation_code').reset_index()
+
+# Function to count null violation codes by action.
+def null_violation_by_action(df):
+    nulls = df[df['violation_code'].isna()]
+    return prepare.null_counts_by(nulls, 'action', 'violation_code').rename('null_violation_code').reset_index()
+
+# Function to build the preview of re-opening inspections (action_reopened.csv).
+def action_reopened(df):
+    return df[prepare.starts_with(df['action'], 'Establishment re-opened by DOHMH')].head(PREVIEW_ROWS)
+
+# Function to build the preview of cited visits that still have null violation codes (action_violationcited.csv).
+def action_violationcited(df, visits=None):
+    cited = prepare.visits_with_null_violations(df, min_rows=1, visits=visits)
+    return cited[prepare.starts_with(cited['action'], 'Violations were cited')].head(PREVIEW_ROWS)
+
+# Function to build the null and zero table of the prepared data (null_zero_counts.csv).
+def null_zero_counts(df):
+    return profiler.null_zero_table(profiler.profile_chunks([df]))
+
+# Artifacts in the bundle: name -> (pipeline stage it is built from, builder). 'raw' is the acquired data;
+# other stages are the names of prepare steps, meaning the data right after that step.
+ARTIFACTS = {
+    'inspections_df_head': ('raw', head_preview),
+    'inspections_df_status': ('raw', status_table),
+    'inspections_df_isna': ('raw', null_table),
+    'inspections_prepare': ('raw', prepare_table),
+    'inspection_type': ('drop_missing_zoning', inspection_types),
+    'inspections_camisg': ('drop_irrelevant_types', camis_null_visits),
+    'null_score_by_inspection_type': ('drop_irrelevant_types', null_score_by_inspection_type),
+    'null_violation_by_inspection_type': ('drop_administrative', null_violation_by_inspection_type),
+    'null_violation_by_action': ('drop_administrative', null_violation_by_action),
+    'action_reopened': ('fill_no_violations', action_reopened),
+    'null_violation_by_action_after_fill': ('fill_no_violations', null_violation_by_action),
+    'action_violationcited': ('fill_no_violations', action_violationcited),
+    'null_zero_counts': ('standardize', null_zero_counts),
+}
+
+# Function to hash a string.
+def _sha256(text):
+    return hashlib.sha256(text.encode()).hexdigest()
+
+# Function to hash the inputs of an artifact: the stored years it reads and the code that produces it, which
+# includes the modules that read the store (snapshot) and profile it (profiler), and for prepared stages the
+# prepare steps.
+def input_hash(name, dataset_state):
+    stage, builder = ARTIFACTS[name]
+    code = inspect.getsource(builder) + inspect.getsource(snapshot) + inspect.getsource(profiler)
+    if stage != 'raw':
+        code += inspect.getsource(prepare)
+    return _sha256(json.dumps(dataset_state, sort_keys=True) + code)
+
+# Function to encode an artifact value as JSON-compatible data.
+def _encode(value):
+    if isinstance(value, pd.DataFrame):
+        return 'table', json.loads(value.to_json(orient='split', date_format='iso'))
+    return 'text', value
+
+# Function to build (or incrementally rebuild) the bundle for a year range of the snapshot store.
+# Years that are not stored yet are acquired first, which needs an app token.
+def build_bundle(start_year, end_year, app_token=None, root=snapshot.DATASET_ROOT, path=BUNDLE_PATH, force=False):
+    stored = set(snapshot.stored_years(root))
+    if any(year not in stored for year in range(start_year, end_year + 1)):
+        acquire.get_health_inspection_data(start_year, end_year, app_token, root=root, stream=True)
+
+    manifest = snapshot.load_manifest(root)
+    dataset_state = {str(year): manifest['years'][str(year)] for year in range(start_year, end_year + 1)}
+
+    previous = None
+    if os.path.isfile(path) and not force:
+        with open(path) as f:
+            previous = json.load(f)
+
+    # Artifacts whose inputs are unchanged are carried over from the previous bundle
+    hashes = {name: input_hash(name, dataset_state) for name in ARTIFACTS}
+    entries, data = {}, {}
+    stale = []
+    for name in ARTIFACTS:
+        if previous and previous['manifest'].get(name, {}).get('inputs') == hashes[name]:
+            entries[name] = previous['manifest'][name]
+            data[name] = previous['data'][name]
+        else:
+            stale.append(name)
+
+    if stale:
+        # The data is only loaded and prepared when something has to be rebuilt
+        stages = {'raw': snapshot.read_partitions(start_year, end_year, root)}
+        stages.update(prepare.iter_steps(stages['raw']))
+
+        # Visits are grouped once on the raw rows; every later stage keeps their index and reuses the grouping
+        visits = prepare.Visits(stages['raw'])
+
+        for name in stale:
+            stage, builder = ARTIFACTS[name]
+            uses_visits = 'visits' in inspect.signature(builder).parameters
+            kind, data[name] = _encode(builder(stages[stage], visits) if uses_visits else builder(stages[stage]))
+            entries[name] = {
+                'kind': kind,
+                'stage': stage,
+                'inputs': hashes[name],
+                'hash': _sha256(json.dumps(data[name], sort_keys=True)),
+            }
+
+    # The bundle version only moves when some artifact's content actually changed
+    version = previous['version'] if previous else 0
+    changed = [name for name in stale if not previous or previous['manifest'].get(name, {}).get('hash') != entries[name]['hash']]
+    if changed or not previous:
+        version += 1
+
+    bundle = {
+        'format': BUNDLE_FORMAT,
+        'version': version,
+        'built_at': datetime.now(timezone.utc).isoformat(timespec='seconds') if changed or not previous else previous['built_at'],
+        'years': [int(start_year), int(end_year)],
+        'manifest': entries,
+        'data': data,
+    }
+    with open(path, 'w') as f:
+        json.dump(bundle, f)
+
+    print(f"Artifact bundle v{version} written to {path}: {len(stale)} rebuilt, {len(ARTIFACTS) - len(stale)} unchanged.")
+    return bundle
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build the artifact bundle displayed by the app.')
+    parser.add_argument('start_year', type=int)
+    parser.add_argument('end_year', type=int)
+    parser.add_argument('--app-token', default=os.environ.get('NYC_APP_TOKEN'))
+    parser.add_argument('--path', default=BUNDLE_PATH)
+    parser.add_argument('--force', action='store_true', help='rebuild every artifact')
+    args = parser.parse_args()
+    build_bundle(args.start_year, args.end_year, args.app_token, path=args.path, force=args.force)
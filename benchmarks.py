@@ -0,0 +1,880 @@
+# Import necessary libraries
+import argparse
+import ast
+import io
+import json
+import multiprocessing
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+import numpy as np
+import pandas as pd
+from streamlit.testing.v1 import AppTest
+
+import acquire
+import camis_index
+import content as cn
+import fake_socrata
+import feature_store
+import geo_index
+import normalize
+import place_match
+import predict
+import prepare
+import reviews
+import snapshot
+
+# ----------------------------------------------------------------------------------------------------------
+# Benchmarks
+# This script times the project's data pipeline and app on synthetic inspections data shaped like the real
+# 43nn-pn8j dataset. Run a benchmark with, for example:
+#   python benchmarks.py prepare --rows 1000000
+# __________________________________________________________________________________________________________
+
+# Every inspection type listed in the Prepare section
+INSPECTION_TYPES = ast.literal_eval(cn.inspection_type.strip())
+
+ACTIONS = [
+    'Violations were cited in the following area(s).',
+    'No violations were recorded at the time of this inspection.',
+    'Establishment re-opened by DOHMH.',
+    'Establishment Closed by DOHMH. Violations were cited in the following area(s) and those conditions were declared to be public health hazards.',
+    'Establishment re-closed by DOHMH.',
+]
+BOROS = ['Manhattan', 'Brooklyn', 'Queens', 'Bronx', 'Staten Island']
+CUISINES = ['American', 'Chinese', 'Italian', 'Pizza', 'Mexican', 'Coffee/Tea', 'Japanese', 'Bakery Products/Desserts',
+            'Caribbean', 'Latin American', 'Indian', 'French', 'Thai', 'Korean', 'Spanish']
+CRITICAL_FLAGS = ['Critical', 'Not Critical', 'Not Applicable']
+STREETS = ['BROADWAY', 'EAST    7 STREET', 'ROOSEVELT AVENUE', 'ARTHUR AVENUE', '3 AVENUE', 'MAIN ST', 'WEST BROADWAY',
+           'AMSTERDAM AVENUE', 'FLATBUSH AVE', 'W 34TH ST']
+VIOLATION_CODES = [f'{n:02d}{letter}' for n in range(2, 11) for letter in 'ABCDEFGHIJ']
+
+# Function to build a synthetic raw inspections frame (as read from the legacy CSV) with `n_rows` rows.
+# Rows come in visits of one restaurant on one date, so visit-level grouping behaves like the real data.
+def make_inspections(n_rows, seed=0):
+    rng = np.random.default_rng(seed)
+
+    # Each visit gets between 1 and 6 violation rows
+    n_visits = max(1, n_rows // 3)
+    visit_sizes = rng.integers(1, 7, n_visits)
+    visit_ids = np.repeat(np.arange(n_visits), visit_sizes)[:n_rows]
+    if len(visit_ids) < n_rows:
+        visit_ids = np.concatenate([visit_ids, np.full(n_rows - len(visit_ids), n_visits - 1)])
+
+    # Restaurants have several visits each; per-restaurant attributes are drawn once and broadcast
+    n_restaurants = max(1, n_visits // 4)
+    visit_restaurant = rng.integers(0, n_restaurants, n_visits)
+    visit_date = pd.Timestamp('2015-01-01') + pd.to_timedelta(rng.integers(0, 9 * 365, n_visits), unit='D')
+    visit_type = rng.choice(len(INSPECTION_TYPES), n_visits)
+    visit_action = rng.choice(len(ACTIONS), n_visits, p=[0.8, 0.12, 0.04, 0.03, 0.01])
+    visit_score = rng.integers(0, 60, n_visits).astype(float)
+
+    restaurant = visit_restaurant[visit_ids]
+    boro = rng.integers(0, len(BOROS), n_restaurants)[restaurant]
+    lat = (40.55 + rng.random(n_restaurants) * 0.35)[restaurant]
+    lon = (-74.15 + rng.random(n_restaurants) * 0.45)[restaurant]
+    inspection_type = np.asarray(INSPECTION_TYPES, dtype=object)[visit_type[visit_ids]]
+
+    # Zoning identifiers are missing together for a small share of restaurants
+    zoning_missing = (rng.random(n_restaurants) < 0.02)[restaurant]
+    bin_ = np.where(zoning_missing, np.nan, (1000000 + restaurant).astype(float))
+
+    # Administrative inspections have no score; a few rows have no violation code
+    score = visit_score[visit_ids]
+    score[np.char.startswith(inspection_type.astype(str), 'Administrative')] = np.nan
+    violation_code = np.asarray(VIOLATION_CODES, dtype=object)[rng.integers(0, len(VIOLATION_CODES), n_rows)]
+    violation_code[rng.random(n_rows) < 0.01] = np.nan
+    violation_description = ('Violation ' + pd.Series(violation_code, dtype=object)).to_numpy()
+
+    phone = (2120000000 + rng.integers(0, 9999999, n_restaurants)).astype(str).astype(object)
+    phone[rng.random(n_restaurants) < 0.001] = np.nan
+
+    dates = visit_date[visit_ids]
+    return pd.DataFrame({
+        'camis': 40000000 + restaurant,
+        'dba': np.char.add('RESTAURANT ', restaurant.astype(str)).astype(object),
+        'boro': np.asarray(BOROS, dtype=object)[boro],
+        'building': (1 + restaurant % 3000).astype(str).astype(object),
+        'street': np.asarray(STREETS, dtype=object)[restaurant % len(STREETS)],
+        'zipcode': (10001 + restaurant % 400).astype(float),
+        'phone': phone[restaurant],
+        'cuisine_description': np.asarray(CUISINES, dtype=object)[restaurant % len(CUISINES)],
+        'inspection_date': dates.strftime('%Y-%m-%dT00:00:00.000'),
+        'action': np.asarray(ACTIONS, dtype=object)[visit_action[visit_ids]],
+        'critical_flag': np.asarray(CRITICAL_FLAGS, dtype=object)[rng.integers(0, 3, n_rows)],
+        'score': score,
+        'record_date': '2023-12-01T06:00:08.000',
+        'inspection_type': inspection_type,
+        'latitude': lat,
+        'longitude': lon,
+        'community_board': (101 + boro * 100 + restaurant % 12).astype(float),
+        'council_district': (1 + restaurant % 51).astype(float),
+        'census_tract': (100 + restaurant % 9000).astype(float),
+        'bin': bin_,
+        'bbl': np.where(zoning_missing, np.nan, (1000000000 + restaurant).astype(float)),
+        'nta': np.char.add('NTA', (restaurant % 190).astype(str)).astype(object),
+        'violation_code': violation_code,
+        'violation_description': violation_description,
+        'grade': pd.Series('A', index=range(n_rows), dtype=object).where(rng.random(n_rows) < 0.5),
+        'grade_date': np.nan,
+    })
+
+# Function to run the preparation steps exactly as the Prepare section's code snippets show them.
+def prepare_as_displayed(inspection_df):
+    inspection_df = inspection_df.drop(['grade', 'grade_date'], axis=1)
+    inspection_df = inspection_df.dropna(subset=['bin'])
+    inspection_df = inspection_df.dropna(subset=['council_district'])
+
+    remove_types = ["Calorie Posting", "Pre-permit", "Smoke-Free Air Act", "Trans Fat"]
+    inspection_df = inspection_df[~inspection_df['inspection_type'].str.startswith(tuple(remove_types))]
+
+    grouped = inspection_df.groupby(['camis', 'inspection_date'])
+    groups_with_nulls = grouped.apply(lambda x: x['violation_code'].isna().any())
+    group_sizes = grouped.size()
+    filtered_groups = groups_with_nulls[groups_with_nulls].index.intersection(group_sizes[group_sizes >= 2].index)
+    inspection_df[inspection_df.set_index(['camis', 'inspection_date']).index.isin(filtered_groups)].reset_index(drop=True)
+
+    inspection_df.groupby('inspection_type').apply(lambda x: x['score'].isnull().sum())
+    inspection_df = inspection_df[~inspection_df['inspection_type'].str.startswith("Administrative")]
+    inspection_df.groupby('inspection_type').apply(lambda x: x['violation_code'].isnull().sum())
+
+    violation_code_null = inspection_df[inspection_df['violation_code'].isna()]
+    violation_code_null.groupby('action').apply(lambda x: x['violation_code'].isnull().sum())
+
+    inspection_df = inspection_df.copy()
+    condition = inspection_df['violation_code'].isna() & inspection_df['action'].str.startswith("No violations were recorded at the time of this inspection.")
+    inspection_df.loc[condition, ['violation_code', 'violation_description']] = ['none', 'No violations were recorded']
+    condition = (inspection_df['violation_code'].isna() &
+                 inspection_df['action'].str.startswith("Establishment re-opened") &
+                 (inspection_df['critical_flag'] == 'Not Applicable'))
+    inspection_df.loc[condition, ['violation_code', 'violation_description']] = ['none', 'No violations were recorded']
+    inspection_df = inspection_df.drop(inspection_df[(inspection_df['violation_code'].isna()) &
+                                                     (inspection_df['action'].str.startswith("Violations were cited in the following area(s)"))].index)
+
+    inspection_df['phone'] = inspection_df['phone'].fillna('0000000000')
+    inspection_df['score'] = inspection_df['score'].astype(int)
+
+    columns_to_check = ['zipcode', 'score', 'community_board', 'council_district', 'census_tract', 'bin', 'bbl']
+    for column in columns_to_check:
+        (inspection_df[column] % 1 == 0).all()
+    for column in columns_to_check:
+        inspection_df[column] = inspection_df[column].astype(int)
+        inspection_df[column] = inspection_df[column].astype(str)
+
+    inspection_df['phone'] = inspection_df['phone'].str.replace(r'\D', '', regex=True)
+    inspection_df['phone'] = inspection_df['phone'].str.strip().replace(['', '0000000000'], '1000000000')
+    inspection_df['inspection_date'] = pd.to_datetime(inspection_df['inspection_date']).dt.strftime('%Y-%m-%d')
+    return inspection_df
+
+# Function to run the vectorized pipeline together with the analysis steps the displayed snippets perform.
+def prepare_vectorized(df):
+    filtered = df.dropna(subset=['bin', 'council_district'])
+    filtered = filtered[~prepare.starts_with(filtered['inspection_type'], prepare.REMOVE_TYPES[:-1])]
+    prepare.visits_with_null_violations(filtered)
+    prepare.null_counts_by(filtered, 'inspection_type', 'score')
+    filtered = filtered[~prepare.starts_with(filtered['inspection_type'], 'Administrative')]
+    prepare.null_counts_by(filtered, 'inspection_type', 'violation_code')
+    prepare.null_counts_by(filtered[filtered['violation_code'].isna()], 'action', 'violation_code')
+    return prepare.prepare_inspections(df)
+
+# Function to time a callable, returning the best wall-clock time over `repeat` runs and its last result.
+def timed(func, *args, repeat=1):
+    best, result = float('inf'), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func(*args)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+# Function to compare restaurant lookups through the camis index against filtering the whole frame, and an
+# incremental index refresh after one year is re-fetched against a full rebuild.
+def bench_camis(rows, lookups=1_000):
+    df = snapshot.coerce_to_schema(make_inspections(rows))
+    years = range(2015, 2024)
+    with tempfile.TemporaryDirectory() as root:
+        snapshot.write_partitions(df, years, root)
+        build_time, index = timed(camis_index.build_index, root)
+        sample = np.random.default_rng(0).choice(index.restaurants['camis'].to_numpy(), lookups)
+
+        # Lookups must return the same rows and visits as a filter over the frame
+        rows_sorted = df.sort_values(['camis', 'inspection_date'], kind='stable')
+        for camis in sample[:20]:
+            expected = rows_sorted[rows_sorted['camis'] == camis].reset_index(drop=True)
+            pd.testing.assert_frame_equal(index.lookup(camis).reset_index(drop=True), expected, check_dtype=False,
+                                          check_categorical=False)
+            visits = expected.groupby('inspection_date')['score'].max()
+            assert (index.timeline(camis)['inspection_date'].to_numpy() == visits.index.to_numpy()).all()
+
+        def filter_lookups():
+            for camis in sample:
+                frame = df[df['camis'] == camis]
+                frame.groupby('inspection_date', observed=True).agg(score=('score', 'max'), action=('action', 'last'))
+
+        def index_lookups():
+            for camis in sample:
+                index.lookup(camis)
+                index.timeline(camis)
+
+        filter_time = timed(filter_lookups)[0]
+        index_time = timed(index_lookups)[0]
+
+        # Re-fetch the last year with extra rows, then refresh the saved index and rebuild it from scratch
+        extra = snapshot.coerce_to_schema(make_inspections(rows // 50, seed=1))
+        last_year = df[df['inspection_date'].dt.year == years[-1]]
+        extra = extra[extra['inspection_date'].dt.year == years[-1]]
+        snapshot.write_year_partition(pd.concat([last_year, extra], ignore_index=True), years[-1], root)
+        refresh_time, refreshed = timed(camis_index.refresh_index, root)
+        rebuild_time, rebuilt = timed(camis_index.build_index, root)
+        pd.testing.assert_frame_equal(refreshed.restaurants, rebuilt.restaurants)
+        pd.testing.assert_frame_equal(refreshed.visits, rebuilt.visits)
+        pd.testing.assert_frame_equal(refreshed.rows, rebuilt.rows, check_categorical=False)
+
+    print(f'camis ({rows:,} rows, {len(index):,} restaurants, {len(index.visits):,} visits)')
+    print(f'  build index                 : {build_time:8.3f} s')
+    print(f'  {lookups:,} lookups, filter frame : {filter_time:8.3f} s  ({filter_time / lookups * 1e6:8.1f} us each)')
+    print(f'  {lookups:,} lookups, index        : {index_time:8.3f} s  ({index_time / lookups * 1e6:8.1f} us each, '
+          f'{filter_time / index_time:.0f}x faster)')
+    print(f'  one year re-fetched, refresh: {refresh_time:8.3f} s')
+    print(f'  one year re-fetched, rebuild: {rebuild_time:8.3f} s')
+
+# Function to compare the vectorized prepare module against the displayed snippets.
+def bench_prepare(rows):
+    df = make_inspections(rows)
+    displayed_time, displayed = timed(prepare_as_displayed, df)
+    vectorized_time, vectorized = timed(prepare_vectorized, df)
+
+    # Both paths must produce the same cleaned values (the module returns them in the compact schema)
+    displayed = snapshot.coerce_to_schema(displayed, snapshot.PREPARED_SCHEMA)
+    pd.testing.assert_frame_equal(displayed.reset_index(drop=True), vectorized.reset_index(drop=True), check_dtype=False,
+                                  check_categorical=False)
+
+    print(f'prepare ({rows:,} rows -> {len(vectorized):,} rows)')
+    print(f'  displayed snippets : {displayed_time:8.3f} s')
+    print(f'  prepare module     : {vectorized_time:8.3f} s  ({displayed_time / vectorized_time:.1f}x faster)')
+
+# Function run in its own process to serve synthetic rows until told to stop.
+def _serve_worker(rows, url_queue, stop):
+    with fake_socrata.FakeSocrataServer(fake_socrata.make_rows(rows)) as server:
+        url_queue.put(server.url)
+        stop.wait()
+
+# Function run in a fresh process to ingest from the stand-in server and report that process's peak memory.
+def _ingest_worker(url, streaming, root, queue):
+    acquire.BASE_URL = url
+    acquire.RATE_LIMITER = acquire.TokenBucket(1e9, 1e9)
+    start = time.perf_counter()
+    if streaming:
+        acquire.ingest_health_inspection_data(2015, 2023, 'token', root=root)
+    else:
+        acquire.process_data(2015, 2023, 'token')
+    queue.put((time.perf_counter() - start, acquire.peak_memory_mb()))
+
+# Function to compare peak memory of streaming ingestion with accumulating every page in a list.
+# The server and each ingestion run get their own processes, so the peak RSS of a run is its own.
+# With max_rss_mb set, the run fails if streaming ingestion goes over that ceiling.
+def bench_ingest(rows, max_rss_mb=None):
+    context = multiprocessing.get_context('spawn')
+    url_queue, stop = context.Queue(), context.Event()
+    server = context.Process(target=_serve_worker, args=(rows, url_queue, stop))
+    server.start()
+    url = url_queue.get()
+
+    results = {}
+    try:
+        with tempfile.TemporaryDirectory() as root:
+            for streaming in (False, True):
+                queue = context.Queue()
+                worker = context.Process(target=_ingest_worker, args=(url, streaming, root, queue))
+                worker.start()
+                results[streaming] = queue.get()
+                worker.join()
+    finally:
+        stop.set()
+        server.join()
+
+    print(f'ingest ({rows:,} rows)')
+    print(f'  accumulate pages : {results[False][0]:8.2f} s  peak RSS {results[False][1]:8.1f} MB')
+    print(f'  streaming        : {results[True][0]:8.2f} s  peak RSS {results[True][1]:8.1f} MB')
+
+    if max_rss_mb is not None and results[True][1] > max_rss_mb:
+        raise SystemExit(f'Streaming ingestion peaked at {results[True][1]:.1f} MB, above the {max_rss_mb} MB ceiling')
+
+# Function to fetch every row from a stand-in server, returning the rows, seconds taken and the server's fault counts.
+def _fetch_from(server_options, rows, concurrency):
+    with fake_socrata.FakeSocrataServer(fake_socrata.make_rows(rows), **server_options) as server:
+        acquire.BASE_URL = server.url
+        start = time.perf_counter()
+        df = acquire.process_data(2015, 2023, 'token', concurrency=concurrency)
+        return df, time.perf_counter() - start, server.faults
+
+# Function to check that fetching survives throttling, server errors, slow responses and dropped connections, and
+# that an interrupted run resumes from its last checkpoint. Backoff and timeouts are scaled down so the run takes
+# seconds.
+def bench_retry(rows):
+    acquire.BACKOFF_BASE, acquire.BACKOFF_CAP, acquire.REQUEST_TIMEOUT = 0.02, 0.5, 0.25
+    acquire.RATE_LIMITER = acquire.TokenBucket(200, 20)
+    pages = -(-rows // acquire.PAGE_SIZE) + 1
+    faulty = {'throttle_rate': 0.1, 'error_rate': 0.1, 'slow_rate': 0.05, 'slow_seconds': 0.5, 'cut_rate': 0.05,
+              'retry_after': 0}
+
+    print(f'retry ({rows:,} rows, {pages} pages, 200 requests/s budget)')
+    clean, clean_time, _ = _fetch_from({}, rows, 4)
+    print(f'  no faults          : {clean_time:8.2f} s  {pages / clean_time:7.1f} pages/s')
+    for concurrency in (1, 4):
+        df, elapsed, faults = _fetch_from(faulty, rows, concurrency)
+        assert df.equals(clean), 'rows fetched with faults differ from a clean run'
+        print(f'  faults, {concurrency} worker(s) : {elapsed:8.2f} s  {pages / elapsed:7.1f} pages/s  '
+              f'({faults["throttled"]} x 429, {faults["errors"]} x 500, {faults["slow"]} timed out, {faults["cut"]} cut off)')
+
+    # An outage longer than the retry budget fails the run part way; the second call picks up where it stopped
+    outage = (pages // 2, pages // 2 + acquire.MAX_RETRIES)
+    with tempfile.TemporaryDirectory() as root:
+        checkpoint = os.path.join(root, 'pages')
+        with fake_socrata.FakeSocrataServer(fake_socrata.make_rows(rows), outage=outage) as server:
+            acquire.BASE_URL = server.url
+            try:
+                acquire.process_data(2015, 2023, 'token', checkpoint=checkpoint)
+                raise AssertionError('the outage should have failed the first run')
+            except acquire.APIRequestError:
+                failed_at = len(server.requests)
+            resumed = acquire.process_data(2015, 2023, 'token', checkpoint=checkpoint)
+            assert resumed.equals(clean), 'resumed rows differ from a clean run'
+            print(f'  resume after outage: first run failed after {failed_at} requests, second run needed '
+                  f'{len(server.requests) - failed_at} more ({pages} for a full run)')
+
+    # A checkpoint left by a run in one mode (sequential or concurrent) is discarded, not misread, by the other.
+    # The outage is long enough to exhaust the retries of every concurrent worker; the rerun finds the server back.
+    outage = (pages // 2, pages // 2 + 4 * (acquire.MAX_RETRIES + 1))
+    for first, second in ((4, 1), (1, 4)):
+        with tempfile.TemporaryDirectory() as root:
+            checkpoint = os.path.join(root, 'pages')
+            with fake_socrata.FakeSocrataServer(fake_socrata.make_rows(rows), outage=outage) as server:
+                acquire.BASE_URL = server.url
+                try:
+                    acquire.process_data(2015, 2023, 'token', concurrency=first, checkpoint=checkpoint)
+                    raise AssertionError('the outage should have failed the first run')
+                except acquire.APIRequestError:
+                    pass
+            with fake_socrata.FakeSocrataServer(fake_socrata.make_rows(rows)) as server:
+                acquire.BASE_URL = server.url
+                resumed = acquire.process_data(2015, 2023, 'token', concurrency=second, checkpoint=checkpoint)
+                assert resumed.equals(clean), f'rows resumed with {second} worker(s) differ from a clean run'
+        print(f'  resume in another mode: {first} worker(s) failed, {second} worker(s) rerun matches a clean run')
+
+# Function to compare offset and keyset pagination against a stand-in server where each skipped row costs time,
+# reporting total time and how per-page latency changes from the start to the end of the history.
+def bench_pagination(rows, offset_cost=2e-7):
+    acquire.RATE_LIMITER = acquire.TokenBucket(1e9, 1e9)
+    print(f'pagination ({rows:,} rows, {offset_cost * 1e6:.2f} s per million rows skipped)')
+
+    results = {}
+    with fake_socrata.FakeSocrataServer(fake_socrata.make_rows(rows), offset_cost=offset_cost) as server:
+        acquire.BASE_URL = server.url
+        for keyset, page_size in ((False, 1000), (True, 1000), (True, 10_000), (True, acquire.MAX_PAGE_SIZE)):
+            latencies, fetched = [], []
+            start = last = time.perf_counter()
+            for data in acquire.iter_pages(2015, 2023, 'token', page_size=page_size, keyset=keyset):
+                now = time.perf_counter()
+                latencies.append((now - last) / len(data) * 1000)
+                fetched.extend(data['camis'].tolist())
+                last = now
+            total = time.perf_counter() - start
+
+            # Per-page latency per thousand rows, over the first and last tenth of the pages
+            tenth = max(1, len(latencies) // 10)
+            first, final = np.mean(latencies[:tenth]) * 1000, np.mean(latencies[-tenth:]) * 1000
+            results[keyset, page_size] = fetched
+            mode = 'keyset' if keyset else 'offset'
+            print(f'  {mode} pages of {page_size:>6,} : {total:8.2f} s  {len(latencies):5} pages  '
+                  f'ms per 1k rows: first 10% {first:6.2f}, last 10% {final:6.2f}')
+
+    assert all(fetched == results[False, 1000] for fetched in results.values()), 'pagination modes returned different rows'
+
+# Function to measure how many bytes $select/$where pushdown of the Prepare section's columns and filters saves,
+# checking the query string sent and that the result matches filtering a full pull locally.
+def bench_pushdown(rows):
+    acquire.RATE_LIMITER = acquire.TokenBucket(1e9, 1e9)
+    pushdown = {'columns': prepare.SOURCE_COLUMNS, 'filters': prepare.SOURCE_FILTERS}
+    print(f'pushdown ({rows:,} rows)')
+
+    # One restaurant name holds characters that end a parameter ('&'), start a fragment ('#') or stand for a space
+    # ('+') in a URL, and a quote, so filter literals must reach the server encoded
+    source_rows = fake_socrata.make_rows(rows)
+    source_rows[5]['dba'] = "A&B #1+2 JOE'S"
+
+    results = {}
+    with fake_socrata.FakeSocrataServer(source_rows) as server:
+        acquire.BASE_URL = server.url
+        for name, options in (('full pull', {}), ('pushdown', pushdown)):
+            with tempfile.TemporaryDirectory() as root:
+                server.bytes_sent, server.requests = 0, []
+                start = time.perf_counter()
+                df = acquire.get_health_inspection_data(2015, 2023, 'token', root=root, **options)
+                elapsed = time.perf_counter() - start
+                results[name] = df
+                print(f'  {name:9} : {elapsed:6.2f} s  {len(df):9,} rows  {len(server.requests):5} requests  '
+                      f'{server.bytes_sent / 1e6:8.1f} MB sent')
+            params = server.requests[0]
+
+        with tempfile.TemporaryDirectory() as root:
+            named = acquire.get_health_inspection_data(2015, 2023, 'token', root=root,
+                                                       filters=[('dba', '=', "A&B #1+2 JOE'S")])
+            assert named['dba'].tolist() == ["A&B #1+2 JOE'S"], 'a literal with URL characters was not sent intact'
+            assert server.requests[-1]['$where'].endswith(" and ((dba = 'A&B #1+2 JOE''S'))")
+
+            # A single string for 'in' is one value, both in the pushdown and in the filter applied on read
+            boro = acquire.get_health_inspection_data(2015, 2023, 'token', root=root, filters=[('boro', 'in', 'Manhattan')])
+            assert len(boro) and (boro['boro'] == 'Manhattan').all(), "a single 'in' value matched no rows"
+
+    # The first request must carry the projection and the filter, written out in full so a bug in the SoQL
+    # that build_select and build_where generate shows up here
+    assert params['$select'] == (
+        ':id,camis,dba,boro,building,street,zipcode,phone,cuisine_description,inspection_date,action,critical_flag,'
+        'score,record_date,inspection_type,latitude,longitude,community_board,council_district,census_tract,bin,bbl,'
+        'nta,violation_code,violation_description')
+    assert params['$where'] == (
+        'inspection_date between "2015-01-01T00:00:00.000" and "2023-12-31T23:59:59.999" and '
+        "((inspection_type is null or not (starts_with(inspection_type, 'Calorie Posting') or "
+        "starts_with(inspection_type, 'Pre-permit') or starts_with(inspection_type, 'Smoke-Free Air Act') or "
+        "starts_with(inspection_type, 'Trans Fat') or starts_with(inspection_type, 'Administrative'))))")
+    assert 'grade' not in results['pushdown'].columns
+    print(f"  $where    : {params['$where']}")
+
+    # Columns the stand-in never sends are absent from the full pull and all-null in the pushdown result
+    full = results['full pull']
+    expected = full[acquire.filter_mask(full, prepare.SOURCE_FILTERS)].reset_index(drop=True)
+    columns = [column for column in results['pushdown'].columns if column in full.columns]
+    pd.testing.assert_frame_equal(expected[columns], results['pushdown'][columns], check_categorical=False)
+
+# Function run in a fresh process to pull every row in one page format and report time and peak memory.
+def _parse_worker(url, page_format, page_size, queue):
+    acquire.BASE_URL, acquire.PAGE_FORMAT = url, page_format
+    acquire.RATE_LIMITER = acquire.TokenBucket(1e9, 1e9)
+    start = time.perf_counter()
+    df = snapshot.coerce_to_schema(acquire.process_data(2015, 2023, 'token', page_size=page_size))
+    queue.put((time.perf_counter() - start, acquire.peak_memory_mb(), len(df)))
+
+# Function to compare parsing pages from JSON (a list of row dicts per page) with streaming CSV into typed
+# columns: parse time per page on the same rows, then a full pull and peak memory in fresh processes.
+def bench_parse(rows, page_size=10_000):
+    print(f'parse ({rows:,} rows)')
+
+    # Full pulls run first, while this process is still small: a child's peak RSS starts at its parent's
+    context = multiprocessing.get_context('spawn')
+    url_queue, stop = context.Queue(), context.Event()
+    serve = context.Process(target=_serve_worker, args=(rows, url_queue, stop))
+    serve.start()
+    url = url_queue.get()
+    try:
+        for page_format in ('json', 'csv'):
+            queue = context.Queue()
+            worker = context.Process(target=_parse_worker, args=(url, page_format, page_size, queue))
+            worker.start()
+            elapsed, peak, fetched = queue.get()
+            worker.join()
+            print(f'  full pull, {page_format:4} : {elapsed:8.2f} s  peak RSS {peak:8.1f} MB  ({fetched:,} rows, pages of {page_size:,})')
+    finally:
+        stop.set()
+        serve.join()
+
+    server = fake_socrata.FakeSocrataServer(fake_socrata.make_rows(min(rows, acquire.MAX_PAGE_SIZE)))
+    for size in sorted({1000, page_size, acquire.MAX_PAGE_SIZE}):
+        params = {'$limit': str(min(size, rows)), '$select': ':id,*'}
+        json_body, csv_body = json.dumps(server.page(params)).encode(), server.page_csv(params).encode()
+        parse_json = timed(lambda: snapshot.coerce_to_schema(pd.DataFrame(json.loads(json_body))), repeat=3)[0]
+        parse_csv = timed(lambda: snapshot.coerce_to_schema(acquire.read_csv_page(io.BytesIO(csv_body))), repeat=3)[0]
+        print(f'  page of {size:>6,} rows : json {parse_json * 1000:8.1f} ms   csv stream {parse_csv * 1000:8.1f} ms  '
+              f'({parse_json / parse_csv:.1f}x)')
+
+# Function to report training time, bulk scoring throughput and cached single-restaurant lookup latency of the
+# outcome predictor, against scoring restaurants one at a time from their own rows.
+def bench_predict(rows, lookups=10_000, one_by_one=300):
+    prepared = prepare.prepare_inspections(snapshot.coerce_to_schema(make_inspections(rows)))
+    index_time, index = timed(camis_index.CamisIndex.build, prepared)
+    train_time, predictor = timed(predict.OutcomePredictor, index)
+    bulk_time, scores = timed(predictor.score_all, repeat=3)
+
+    rng = np.random.default_rng(0)
+    sample = rng.choice(scores['camis'].to_numpy(), lookups)
+    timings = []
+    for camis in sample:
+        start = time.perf_counter()
+        predictor.score(camis)
+        timings.append(time.perf_counter() - start)
+
+    # Scoring one restaurant at a time: filter its rows, extract its features, run the model on one row
+    as_of = index.visits['inspection_date'].max()
+    start = time.perf_counter()
+    for camis in sample[:one_by_one]:
+        own = camis_index.CamisIndex.build(prepared[prepared['camis'] == camis])
+        probability = predictor.model.predict_proba(predictor.features.scoring_set(own, as_of))[0]
+        assert np.isclose(probability, predictor.score(camis))
+    single_rate = one_by_one / (time.perf_counter() - start)
+
+    print(f'predict ({rows:,} rows, {len(scores):,} restaurants, {len(predictor.features.names)} features)')
+    print(f'  build restaurant index       : {index_time:8.3f} s')
+    print(f'  extract features and train   : {train_time:8.3f} s')
+    print(f'  score every restaurant       : {bulk_time:8.3f} s  ({len(scores) / bulk_time:,.0f} restaurants/s)')
+    print(f'  one at a time from rows      : {single_rate:,.0f} restaurants/s')
+    print(f'  cached lookup                : p50 {np.percentile(timings, 50) * 1e6:6.1f} us   '
+          f'p99 {np.percentile(timings, 99) * 1e6:6.1f} us')
+
+# Words synthetic reviews are made of
+REVIEW_WORDS = ['the', 'food', 'was', 'service', 'and', 'place', 'very', 'not', 'really', 'staff', 'delicious',
+                'great', 'clean', 'friendly', 'dirty', 'rude', 'slow', 'cold', 'roaches', 'amazing', 'bland', 'never',
+                'again', 'pizza', 'waiter', 'table', 'good', 'bad', 'terrible', 'fresh']
+
+# Function to write synthetic review files (JSON lines, a few files) for the restaurants of an index.
+def make_reviews(camis, n_reviews, directory, seed=0, files=4, name='reviews'):
+    rng = np.random.default_rng(seed)
+    lengths = rng.integers(5, 40, n_reviews)
+    words = np.asarray(REVIEW_WORDS, dtype=object)[rng.integers(0, len(REVIEW_WORDS), lengths.sum())]
+    texts = [' '.join(review) for review in np.split(words, np.cumsum(lengths)[:-1])]
+    frame = pd.DataFrame({'camis': rng.choice(camis, n_reviews), 'rating': rng.integers(1, 6, n_reviews),
+                          'text': texts})
+    for part, chunk in enumerate(np.array_split(np.arange(n_reviews), files)):
+        frame.iloc[chunk].to_json(os.path.join(directory, f'{name}-{part}.jsonl'), orient='records', lines=True)
+    return frame
+
+# Function to time batched review scoring against scoring one review at a time, and a cached re-run after new
+# reviews arrive against the first run.
+def bench_reviews(rows, n_reviews=200_000, new_share=0.05, one_by_one=2_000):
+    index = camis_index.CamisIndex.build(snapshot.coerce_to_schema(make_inspections(rows)))
+    camis = index.restaurants['camis'].to_numpy()
+    with tempfile.TemporaryDirectory() as directory:
+        cache = os.path.join(directory, 'cache', 'sentiment.parquet')
+        make_reviews(camis, n_reviews, directory)
+        read_time, frame = timed(reviews.read_reviews, directory)
+        cold_time, (scored, cold_new) = timed(reviews.score_reviews, frame, cache)
+
+        # A new export adds a few reviews; only those are scored
+        make_reviews(camis, int(n_reviews * new_share), directory, seed=1, files=1, name='new')
+        frame = reviews.read_reviews(directory)
+        warm_time, (scored, warm_new) = timed(reviews.score_reviews, frame, cache)
+
+        # Same scores from one review at a time
+        sample = scored.sample(one_by_one, random_state=0)
+        start = time.perf_counter()
+        single = [reviews.score_texts([text])[0] for text in sample['text']]
+        single_rate = one_by_one / (time.perf_counter() - start)
+        assert np.allclose(single, sample['sentiment'])
+
+        join_time, joined = timed(lambda: reviews.join_inspections(reviews.sentiment_by_restaurant(scored), index))
+
+    print(f'reviews ({len(frame):,} reviews, {len(index):,} restaurants, {joined["reviews"].notna().sum():,} reviewed)')
+    print(f'  read review files            : {read_time:8.3f} s')
+    print(f'  score, cold cache            : {cold_time:8.3f} s  ({cold_new / cold_time:,.0f} reviews/s)')
+    print(f'  score, {warm_new:,} new reviews   : {warm_time:8.3f} s  ({len(frame) / warm_time:,.0f} reviews/s served)')
+    print(f'  one review at a time         : {single_rate:,.0f} reviews/s')
+    print(f'  aggregate and join           : {join_time:8.3f} s')
+
+# Words synthetic restaurant names are made of
+NAME_WORDS = ['GOLDEN', 'DRAGON', 'PIZZA', 'JOE', 'CAFE', 'BROOKLYN', 'DELI', 'SUSHI', 'TACO', 'BELLA', 'KITCHEN',
+              'GARDEN', 'HOUSE', 'PALACE', 'EXPRESS', 'GRILL', 'BAGEL', 'HALAL', 'NOODLE', 'BAR', 'BISTRO', 'LUCKY',
+              'STAR', 'ROYAL', 'FAMOUS', 'RAY', 'SAL', 'MAMA', 'CORNER', 'BAKERY', 'BURGER', 'CHICKEN', 'THAI',
+              'SPICE', 'VILLAGE', 'EMPIRE', 'LITTLE', 'ITALY', 'OCEAN', 'WOK']
+
+# Function to build synthetic restaurants and the maps places for them: most restaurants have a place whose
+# name, phone and coordinates are perturbed copies of theirs, and some places match no restaurant.
+def make_places(n_restaurants, seed=0, matched_share=0.9, zipcodes=200):
+    rng = np.random.default_rng(seed)
+    words = np.asarray(NAME_WORDS, dtype=object)
+    names = pd.Series(words[rng.integers(0, len(words), n_restaurants)] + ' ' + words[rng.integers(0, len(words), n_restaurants)]
+                      + ' ' + np.arange(n_restaurants).astype(str).astype(object))
+    zipcode = 10001 + rng.integers(0, zipcodes, n_restaurants)
+    latitude = 40.55 + (zipcode - 10001) % 20 * 0.0175 + rng.random(n_restaurants) * 0.0175
+    longitude = -74.15 + (zipcode - 10001) // 20 * 0.045 + rng.random(n_restaurants) * 0.045
+    restaurants = pd.DataFrame({
+        'camis': 40000000 + np.arange(n_restaurants),
+        'dba': names,
+        'building': (1 + rng.integers(0, 3000, n_restaurants)).astype(str),
+        'street': np.asarray(STREETS, dtype=object)[rng.integers(0, len(STREETS), n_restaurants)],
+        'zipcode': pd.array(zipcode, dtype='Int32'),
+        'phone': (2120000000 + rng.integers(0, 9999999, n_restaurants)).astype(str),
+        'latitude': latitude,
+        'longitude': longitude,
+    })
+
+    # Places of matched restaurants: title case, some words dropped, phones missing or formatted, a few
+    # metres of jitter, and now and then a different zipcode
+    matched = np.sort(rng.choice(n_restaurants, int(n_restaurants * matched_share), replace=False))
+    source = restaurants.iloc[matched].reset_index(drop=True)
+    name = source['dba'].str.title().where(rng.random(len(source)) < 0.8, source['dba'].str.split(n=1).str[1])
+    phone = ('(' + source['phone'].str[:3] + ') ' + source['phone'].str[3:6] + '-' + source['phone'].str[6:])
+    n_extra = n_restaurants - len(source)
+    places = pd.DataFrame({
+        'place_id': [f'place-{i}' for i in range(len(source))],
+        'name': name,
+        'building': source['building'],
+        'street': source['street'].str.title(),
+        'zipcode': np.where(rng.random(len(source)) < 0.97, zipcode[matched], 10001 + rng.integers(0, zipcodes, len(source))),
+        'phone': phone.where(rng.random(len(source)) < 0.7),
+        'latitude': source['latitude'] + rng.normal(0, 0.0003, len(source)),
+        'longitude': source['longitude'] + rng.normal(0, 0.0003, len(source)),
+    })
+    extra = make_places(n_extra, seed + 1, 1.0, zipcodes)[1].iloc[:n_extra] if n_extra else places.iloc[:0]
+    extra = extra.assign(place_id=[f'other-{i}' for i in range(len(extra))], phone=None)
+    places = pd.concat([places, extra], ignore_index=True)
+    return restaurants, places, pd.Series(source['camis'].to_numpy(), index=places['place_id'][:len(source)])
+
+# Function to compare blocked place matching with scoring every (restaurant, place) pair, at NYC scale.
+def bench_match(rows, n_restaurants=27_000, naive_sample=3_000):
+    restaurants, places, truth = make_places(n_restaurants)
+    all_pairs = len(restaurants) * len(places)
+
+    print(f'match ({len(restaurants):,} restaurants, {len(places):,} places, {all_pairs:,} possible pairs)')
+    for block in ['zipcode', 'geohash']:
+        pairs_time, (left, right) = timed(place_match.candidate_pairs, restaurants, places, block)
+        match_time, matches = timed(place_match.match_places, restaurants, places, block)
+        expected = truth.reindex(matches['place_id']).to_numpy()
+        correct = (matches['camis'].to_numpy() == expected).sum()
+        print(f'  {block:<8} blocking, candidate pairs : {len(left):,} ({all_pairs / len(left):,.0f}x fewer)'
+              f'  in {pairs_time:6.3f} s')
+        print(f'  {block:<8} blocking, end to end      : {match_time:8.3f} s   {len(matches):,} matches, precision '
+              f'{correct / len(matches):.3f}, recall {correct / len(truth):.3f}')
+
+    # Every pair of a sample, scored the same way, scaled up to all pairs
+    sample_restaurants, sample_places = restaurants.iloc[:naive_sample], places.iloc[:naive_sample]
+    grid = np.arange(naive_sample)
+    naive_time = timed(place_match.score_pairs, sample_restaurants, sample_places, np.repeat(grid, naive_sample),
+                       np.tile(grid, naive_sample))[0]
+    print(f'  all pairs, scored ({naive_sample:,}^2 sample)  : {naive_time:8.3f} s   '
+          f'~{naive_time * all_pairs / naive_sample ** 2:,.0f} s estimated for all pairs')
+
+# Function to compare normalizing names and addresses row by row with normalizing distinct values once, and
+# with a second chunk whose values were seen before.
+def bench_normalize(rows):
+    df = make_inspections(rows)
+    df['street'] = df['street'].where(np.arange(len(df)) % 2 == 0, df['street'].str.title())
+    first, second = df.iloc[:len(df) // 2], df.iloc[len(df) // 2:]
+    rules = {'dba': normalize.dba_rules, 'building': normalize.building_rules, 'street': normalize.street_rules}
+
+    print(f'normalize ({rows:,} rows)')
+    for column, normalizer in normalize.NORMALIZERS.items():
+        rows_time, expected = timed(lambda: rules[column](df[column].astype('string')))
+        normalizer.cache.clear()
+        cold_time = timed(normalizer, first[column])[0]
+        warm_time, normalized = timed(normalizer, second[column])
+        pd.testing.assert_series_equal(normalized, expected.iloc[len(df) // 2:], check_names=False)
+        print(f'  {column:<9} {df[column].nunique():>8,} distinct   every row {rows_time:7.3f} s   '
+              f'distinct values {cold_time:7.3f} s   seen before {warm_time:7.3f} s')
+
+# Function to report memory use of the prepared frame as the Prepare section builds it and in the compact schema.
+def bench_schema(rows):
+    df = make_inspections(rows)
+    displayed = prepare_as_displayed(df)
+    compact = prepare.prepare_inspections(snapshot.coerce_to_schema(df))
+
+    report = snapshot.memory_report(displayed.reset_index(drop=True), compact.reset_index(drop=True))
+    with pd.option_context('display.width', 200, 'display.max_columns', 10):
+        print(f'schema ({rows:,} rows -> {len(compact):,} prepared rows)')
+        print(report)
+
+# Function to time one script run of the app, returning the seconds taken.
+def _time_run(app):
+    start = time.perf_counter()
+    app.run()
+    if app.exception:
+        raise RuntimeError(app.exception[0].message)
+    return time.perf_counter() - start
+
+# Script timing the first run of the app in a fresh interpreter, where nothing but streamlit is imported yet
+_COLD_START = '''
+import sys, time
+from streamlit.testing.v1 import AppTest
+start = time.perf_counter()
+app = AppTest.from_file('streamlit_app.py', default_timeout=60).run()
+print(time.perf_counter() - start, 'pandas' in sys.modules)
+'''
+
+# Function to time a cold start (first session of a fresh server process), returning seconds and whether
+# pandas had to be imported before the first paint.
+def cold_start():
+    output = subprocess.run([sys.executable, '-c', _COLD_START], capture_output=True, text=True, check=True).stdout
+    elapsed, pandas_loaded = output.split()
+    return float(elapsed), pandas_loaded == 'True'
+
+# Function to compare script run times of the app with eager and lazy section rendering.
+# `rows` is used as the number of timed reruns.
+def bench_app(rows):
+    reruns = max(1, min(rows, 50))
+    for mode in ('eager', 'lazy'):
+        os.environ['APP_RENDER_MODE'] = mode
+        cold, pandas_loaded = cold_start()
+        app = AppTest.from_file('streamlit_app.py', default_timeout=60)
+        first = _time_run(app)
+        rerun = min(_time_run(app) for _ in range(reruns))
+        print(f'app ({mode})')
+        print(f'  cold start, fresh process       : {cold * 1000:8.1f} ms  (pandas imported: {pandas_loaded})')
+        print(f'  first run (time to first paint) : {first * 1000:8.1f} ms')
+        print(f'  rerun, nothing opened           : {rerun * 1000:8.1f} ms  ({len(app.markdown)} markdown, {len(app.code)} code blocks)')
+
+        # In lazy mode, opening a section builds only its selected tab
+        if mode == 'lazy':
+            app.toggle(key='section_open_Prepare').set_value(True)
+            opened = _time_run(app)
+            app.radio(key='section_tab_Prepare').set_value('Data Types')
+            switched = _time_run(app)
+            print(f'  open Prepare                    : {opened * 1000:8.1f} ms')
+            print(f'  switch to Data Types tab        : {switched * 1000:8.1f} ms')
+    os.environ.pop('APP_RENDER_MODE')
+
+# Function to compare applying a daily delta to the restaurant index and feature store with rebuilding both from
+# every stored row.
+def bench_features(rows, delta_restaurants=200):
+    df = snapshot.coerce_to_schema(make_inspections(rows))
+    years = range(2015, 2024)
+    with tempfile.TemporaryDirectory() as root:
+        snapshot.write_partitions(df, years, root)
+        index = camis_index.build_index(root)
+        feature_store.build_store(index, root)
+
+        # One day of new inspections: a re-inspection, a day after the last one, for some restaurants
+        rng = np.random.default_rng(1)
+        chosen = rng.choice(index.restaurants['camis'].to_numpy(), delta_restaurants, replace=False)
+        delta = df[df['camis'].isin(chosen)].groupby('camis').head(3).copy()
+        delta['inspection_date'] = df['inspection_date'].max() + pd.Timedelta(days=1)
+        delta['inspection_type'] = 'Cycle Inspection / Re-inspection'
+        last_year = df[df['inspection_date'].dt.year == years[-1]]
+        snapshot.write_year_partition(pd.concat([last_year, delta], ignore_index=True), years[-1], root)
+
+        index_time, index = timed(camis_index.refresh_index, root)
+        store_time, recomputed = timed(feature_store.refresh_store, index, root)
+        incremental = feature_store.read_features(root)
+
+        # Full rebuild from the violation-level rows, into a second store
+        with tempfile.TemporaryDirectory() as rebuild_root:
+            def rebuild():
+                full = camis_index.CamisIndex.build(snapshot.read_partitions(years[0], years[-1], root))
+                full.save(rebuild_root)
+                return feature_store.build_store(full, rebuild_root)
+            rebuild_time = timed(rebuild)[0]
+            rebuild_store_time = timed(feature_store.build_store, index, rebuild_root)[0]
+            pd.testing.assert_frame_equal(incremental, feature_store.read_features(rebuild_root))
+
+        # Point-in-time reads for a training set: one label per restaurant on its latest visit
+        labels = index.restaurants[['camis', 'last_inspection']].rename(columns={'last_inspection': 'as_of'})
+        read_time, as_of = timed(feature_store.features_as_of, labels, root)
+        assert (as_of['inspection_date'].dropna() < as_of.loc[as_of['inspection_date'].notna(), 'as_of']).all()
+
+    print(f'features ({rows:,} rows, {len(index):,} restaurants, {len(incremental):,} feature rows, '
+          f'delta of {delta_restaurants} restaurants / {len(delta)} rows)')
+    print(f'  daily delta, index refresh    : {index_time:8.3f} s')
+    print(f'  daily delta, store refresh    : {store_time:8.3f} s  ({recomputed} restaurants recomputed)')
+    print(f'  daily delta, index + store    : {index_time + store_time:8.3f} s')
+    print(f'  full rebuild, index + store   : {rebuild_time:8.3f} s')
+    print(f'  full rebuild, store only      : {rebuild_store_time:8.3f} s')
+    print(f'  point-in-time read, {len(labels):,} labels : {read_time:8.3f} s')
+
+# Function to compare radius and bounding-box queries on the spatial index with a scan over every restaurant.
+def bench_geo(rows, queries=1_000, metres=500):
+    index = camis_index.CamisIndex.build(snapshot.coerce_to_schema(make_inspections(rows)))
+    build_time, geo = timed(geo_index.GeoIndex.from_camis_index, index)
+
+    rng = np.random.default_rng(0)
+    points = np.column_stack([40.55 + rng.random(queries) * 0.35, -74.15 + rng.random(queries) * 0.45])
+    x, y = geo_index.project(geo.restaurants['latitude'], geo.restaurants['longitude'])
+
+    def scan_radius(latitude, longitude):
+        px, py = geo_index.project(latitude, longitude)
+        distance = np.hypot(x - px, y - py)
+        return geo.restaurants[distance <= metres]
+
+    def scan_bbox(south, west, north, east):
+        latitude, longitude = geo.restaurants['latitude'], geo.restaurants['longitude']
+        return geo.restaurants[(latitude >= south) & (latitude <= north) & (longitude >= west) & (longitude <= east)]
+
+    # Both must find the same restaurants
+    found = 0
+    for latitude, longitude in points[:50]:
+        box = (latitude - 0.005, longitude - 0.005, latitude + 0.005, longitude + 0.005)
+        nearby = geo.within_radius(latitude, longitude, metres)
+        assert sorted(nearby['camis']) == sorted(scan_radius(latitude, longitude)['camis'])
+        assert sorted(geo.within_bbox(*box)['camis']) == sorted(scan_bbox(*box)['camis'])
+        assert nearby['distance_m'].is_monotonic_increasing
+        found += len(nearby)
+
+    def run(query, boxes=False):
+        timings = []
+        for latitude, longitude in points:
+            start = time.perf_counter()
+            if boxes:
+                query(latitude - 0.005, longitude - 0.005, latitude + 0.005, longitude + 0.005)
+            else:
+                query(latitude, longitude) if query is scan_radius else query(latitude, longitude, metres)
+            timings.append(time.perf_counter() - start)
+        return np.percentile(timings, 50) * 1000, np.percentile(timings, 99) * 1000
+
+    print(f'geo ({rows:,} rows, {len(geo):,} located restaurants, {found / 50:.1f} within {metres} m on average)')
+    print(f'  build index               : {build_time * 1000:8.1f} ms')
+    for label, query, boxes in (('radius, scan', scan_radius, False), ('radius, index', geo.within_radius, False),
+                                ('bbox, scan', scan_bbox, True), ('bbox, index', geo.within_bbox, True)):
+        p50, p99 = run(query, boxes)
+        print(f'  {label:<15} p50 {p50:7.3f} ms   p99 {p99:7.3f} ms')
+
+# Function to compute the per-visit flags with groupby(['camis', 'inspection_date']).apply(lambda), one pass per
+# flag, the way the Prepare section's snippets group visits.
+def visit_flags_with_apply(df):
+    grouped = df.groupby(['camis', 'inspection_date'])
+    return pd.DataFrame({
+        'has_null_violation': grouped.apply(lambda x: x['violation_code'].isna().any()),
+        'mixed_types': grouped.apply(lambda x: x['inspection_type'].str.startswith('Administrative').any()
+                                     and x['inspection_type'].str.startswith('Cycle').any()),
+        'max_score': grouped.apply(lambda x: x['score'].max()),
+        'critical_count': grouped.apply(lambda x: (x['critical_flag'] == 'Critical').sum()),
+    })
+
+# Function to compare the visit grouping (built once, then reused) with apply(lambda) per flag.
+def bench_visits(rows):
+    df = make_inspections(rows)
+    columns = ['has_null_violation', 'mixed_types', 'max_score', 'critical_count']
+    apply_time, expected = timed(visit_flags_with_apply, df)
+    group_time, visits = timed(prepare.Visits, df)
+    table_time, table = timed(visits.table, df, repeat=3)
+
+    # Flags of a later stage (fewer rows) reuse the grouping instead of grouping again
+    filtered = df.dropna(subset=['bin', 'council_district'])
+    reuse_time, _ = timed(visits.table, filtered, repeat=3)
+
+    actual = table.set_index(['camis', 'inspection_date'])[columns]
+    pd.testing.assert_frame_equal(actual, expected, check_dtype=False, check_names=False)
+
+    print(f'visits ({rows:,} rows, {len(table):,} visits)')
+    print(f'  apply(lambda), 4 flags     : {apply_time:8.3f} s')
+    print(f'  sort + ngroup, once        : {group_time:8.3f} s')
+    print(f'  visit table, all flags     : {table_time:8.3f} s  ({apply_time / (group_time + table_time):.0f}x faster '
+          f'including the grouping)')
+    print(f'  visit table, later stage   : {reuse_time:8.3f} s')
+
+BENCHMARKS = {
+    'app': bench_app,
+    'camis': bench_camis,
+    'features': bench_features,
+    'geo': bench_geo,
+    'ingest': bench_ingest,
+    'match': bench_match,
+    'normalize': bench_normalize,
+    'pagination': bench_pagination,
+    'parse': bench_parse,
+    'predict': bench_predict,
+    'prepare': bench_prepare,
+    'pushdown': bench_pushdown,
+    'retry': bench_retry,
+    'reviews': bench_reviews,
+    'schema': bench_schema,
+    'visits': bench_visits,
+}
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Run a pipeline benchmark on synthetic inspections data.')
+    parser.add_argument('benchmark', choices=sorted(BENCHMARKS))
+    parser.add_argument('--rows', type=int, default=1_000_000)
+    parser.add_argument('--max-rss-mb', type=float, help='fail the ingest benchmark if streaming peaks above this')
+    args = parser.parse_args()
+    if args.benchmark == 'ingest':
+        bench_ingest(args.rows, args.max_rss_mb)
+    else:
+        BENCHMARKS[args.benchmark](args.rows)
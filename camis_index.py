@@ -0,0 +1,298 @@
+# Import necessary libraries
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import snapshot
+
+# ----------------------------------------------------------------------------------------------------------
+# Restaurant Index
+# This script builds a per-restaurant (camis) index over the snapshot store. The violation rows are kept
+# sorted by camis and inspection date, and two rolled-up tables point into them:
+#   visits       one row per inspection visit (camis + inspection_date) with its score, violation and
+#                critical counts, action and inspection type, also sorted by camis
+#   restaurants  one row per camis with the offsets of its rows and visits and a summary of its history
+# Looking up a restaurant is a hash lookup plus a slice, instead of a filter over every row.
+#
+# The index lives next to the dataset in <root>/_camis_index/ and remembers the manifest entry of every year
+# it contains, so refresh_index() only re-reads the years that changed since it was built. A visit never spans
+# two years, so a refresh recomputes the visits of the changed years from their rows and rebuilds the
+# restaurants from the visits; the rows of the other years are only read from disk when they are looked up.
+# __________________________________________________________________________________________________________
+
+# Directory of the index inside the dataset root
+INDEX_DIR = '_camis_index'
+
+# Columns the rollups are computed from
+ROLLUP_COLUMNS = ['camis', 'inspection_date', 'score', 'critical_flag', 'violation_code', 'action', 'inspection_type']
+
+# Function to pack each row's camis and inspection date into one integer that sorts like the pair.
+def _sort_keys(rows):
+    camis = rows['camis'].to_numpy(dtype='int64')
+    days = rows['inspection_date'].to_numpy().astype('datetime64[D]').astype('int64')
+    return (camis << 32) + days + 2 ** 30
+
+# Function to give the categorical columns of `df` the union of their categories with those in `other`, so the
+# two frames can be concatenated without falling back to object columns.
+def _align_categories(df, other):
+    df = df.copy()
+    for column in df.columns:
+        if isinstance(df[column].dtype, pd.CategoricalDtype) and isinstance(other[column].dtype, pd.CategoricalDtype):
+            missing = other[column].cat.categories.difference(df[column].cat.categories)
+            if len(missing):
+                df[column] = df[column].cat.add_categories(missing)
+    return df
+
+# Function to interleave two frames sorted by camis and inspection date. The kept rows are already in order, so
+# each new row is placed by binary search (after the kept rows with the same or a smaller key) rather than
+# re-sorting everything.
+def _merge_sorted(kept, incoming):
+    incoming = _align_categories(incoming, kept)
+    kept = _align_categories(kept, incoming)
+    positions = np.searchsorted(_sort_keys(kept), _sort_keys(incoming), side='right') + np.arange(len(incoming))
+    order = np.empty(len(kept) + len(incoming), dtype=np.int64)
+    is_new = np.zeros(len(order), dtype=bool)
+    is_new[positions] = True
+    order[~is_new] = np.arange(len(kept))
+    order[is_new] = len(kept) + np.arange(len(incoming))
+    return pd.concat([kept, incoming], ignore_index=True).iloc[order].reset_index(drop=True)
+
+# Function to recompute the row offsets of a visits table from the visit sizes, after it is merged.
+def _with_offsets(visits):
+    visits = visits.copy()
+    sizes = (visits['row_stop'] - visits['row_start']).to_numpy()
+    visits['row_stop'] = np.cumsum(sizes)
+    visits['row_start'] = visits['row_stop'] - sizes
+    return visits
+
+# Function to read the saved rows of some years and put them, with any rows given in `extra`, back in camis
+# order. Each year's rows are stored sorted, so this is a merge of sorted runs.
+def _read_rows(directory, years, extra=None):
+    frames = [pd.read_parquet(os.path.join(directory, f'rows-{year}.parquet')) for year in sorted(years)]
+    if extra is not None:
+        frames.append(extra)
+    rows = snapshot.coerce_to_schema(pd.concat(frames, ignore_index=True) if frames else pd.DataFrame(columns=list(snapshot.SCHEMA)))
+    return rows.iloc[np.argsort(_sort_keys(rows), kind='stable')].reset_index(drop=True)
+
+# Function to compute per-visit rollups from rows sorted by camis and inspection date.
+def _visit_rollups(rows):
+    camis = rows['camis'].to_numpy()
+    dates = rows['inspection_date'].to_numpy()
+    n = len(rows)
+
+    # A new visit (or restaurant) starts wherever the camis or the date changes from the previous row
+    new_camis = np.ones(n, dtype=bool)
+    new_camis[1:] = camis[1:] != camis[:-1]
+    new_visit = new_camis.copy()
+    new_visit[1:] |= dates[1:] != dates[:-1]
+    visit_starts = np.flatnonzero(new_visit)
+    visit_stops = np.append(visit_starts[1:], n)[:len(visit_starts)]
+
+    scores = rows['score'].to_numpy(dtype='float64', na_value=np.nan)
+    critical = (rows['critical_flag'] == 'Critical').to_numpy(dtype=bool).astype(np.int32)
+    has_violation = rows['violation_code'].notna().to_numpy(dtype=bool).astype(np.int32)
+
+    visits = pd.DataFrame({
+        'camis': camis[visit_starts],
+        'inspection_date': dates[visit_starts],
+        'score': np.fmax.reduceat(scores, visit_starts),
+        'violations': np.add.reduceat(has_violation, visit_starts),
+        'critical': np.add.reduceat(critical, visit_starts),
+        'action': rows['action'].to_numpy()[visit_stops - 1],
+        'inspection_type': rows['inspection_type'].to_numpy()[visit_starts],
+        'row_start': visit_starts,
+        'row_stop': visit_stops,
+    })
+    return visits.astype({'score': 'Int16', 'action': 'string', 'inspection_type': 'string'})
+
+# Function to compute per-restaurant rollups, with offsets into both the rows and the visits, from visits sorted
+# by camis and inspection date.
+def _restaurant_rollups(visits):
+    camis = visits['camis'].to_numpy()
+    new_camis = np.ones(len(visits), dtype=bool)
+    new_camis[1:] = camis[1:] != camis[:-1]
+    restaurant_visits = np.flatnonzero(new_camis)
+    restaurant_visit_stops = np.append(restaurant_visits[1:], len(visits))[:len(restaurant_visits)]
+    last_visit = restaurant_visit_stops - 1
+    restaurants = pd.DataFrame({
+        'camis': camis[restaurant_visits],
+        'row_start': visits['row_start'].to_numpy()[restaurant_visits],
+        'row_stop': visits['row_stop'].to_numpy()[last_visit],
+        'visit_start': restaurant_visits,
+        'visit_stop': restaurant_visit_stops,
+        'inspections': restaurant_visit_stops - restaurant_visits,
+        'first_inspection': visits['inspection_date'].to_numpy()[restaurant_visits],
+        'last_inspection': visits['inspection_date'].to_numpy()[last_visit],
+        'last_score': visits['score'].to_numpy()[last_visit],
+        'critical_count': np.add.reduceat(visits['critical'].to_numpy(), restaurant_visits),
+        'last_action': visits['action'].to_numpy()[last_visit],
+    })
+    return restaurants.astype({'last_score': 'Int16', 'last_action': 'string'})
+
+# Function to compute per-visit and per-restaurant rollups from rows sorted by camis and inspection date.
+def _rollups(rows):
+    visits = _visit_rollups(rows)
+    return visits, _restaurant_rollups(visits)
+
+# Class holding the sorted rows and rollups, with constant-time lookups by camis. An index loaded from disk has
+# `rows` None and reads them from `directory` on first use: the rows files of every year, except the `recent`
+# years replaced since it was loaded, whose rows are kept in memory as a (years, rows) pair.
+class CamisIndex:
+    def __init__(self, rows, visits, restaurants, years=None, directory=None, recent=None):
+        self._rows = rows
+        self.visits = visits
+        self.restaurants = restaurants
+        self.years = years or {}
+        self._directory = directory
+        self._recent_years, self._recent_rows = recent or (set(), None)
+        self._positions = pd.Index(restaurants['camis'])
+        self._offsets = restaurants[['row_start', 'row_stop', 'visit_start', 'visit_stop']].to_numpy()
+
+    # Function to build an index from a frame of violation rows.
+    @classmethod
+    def build(cls, df, years=None):
+        rows = df.iloc[np.argsort(_sort_keys(df), kind='stable')].reset_index(drop=True)
+        return cls(rows, *_rollups(rows), years)
+
+    @property
+    def rows(self):
+        if self._rows is None:
+            saved = [year for year in self.years if int(year) not in self._recent_years]
+            self._rows = _read_rows(self._directory, saved, self._recent_rows)
+        return self._rows
+
+    def __len__(self):
+        return len(self.restaurants)
+
+    def __contains__(self, camis):
+        return camis in self._positions
+
+    def _position(self, camis):
+        try:
+            return self._positions.get_loc(camis)
+        except KeyError:
+            raise KeyError(f'camis {camis} is not in the index') from None
+
+    # Function to return the positions of many restaurants in the restaurants table (-1 where unknown).
+    def positions(self, camis):
+        return self._positions.get_indexer(camis)
+
+    # Function to return a restaurant's summary row (offsets, visit count, dates, last score and action).
+    def summary(self, camis):
+        return self.restaurants.iloc[self._position(camis)]
+
+    # Function to return every violation row of a restaurant, in inspection order.
+    def lookup(self, camis):
+        row_start, row_stop = self._offsets[self._position(camis), :2]
+        return self.rows.iloc[row_start:row_stop]
+
+    # Function to return a restaurant's inspection timeline: one row per visit, in date order.
+    def timeline(self, camis):
+        visit_start, visit_stop = self._offsets[self._position(camis), 2:]
+        return self.visits.iloc[visit_start:visit_stop]
+
+    # Function to replace the rows of some inspection years with new ones. Visits never span years, so the visits
+    # of the other years are kept and the new years' visits merged in; the restaurants are then rolled up from
+    # the visits alone. Rows that are loaded get the new rows merged in; rows that are not stay unread.
+    def update(self, df, years, marks=None):
+        years = [int(year) for year in years]
+        incoming = df.iloc[np.argsort(_sort_keys(df), kind='stable')].reset_index(drop=True)
+
+        kept = self.visits[~self.visits['inspection_date'].dt.year.isin(years).to_numpy()]
+        visits = _with_offsets(_merge_sorted(kept, _visit_rollups(incoming[ROLLUP_COLUMNS])))
+        restaurants = _restaurant_rollups(visits)
+
+        updated = dict(self.years)
+        for year in years:
+            updated[str(year)] = (marks or {}).get(str(year))
+
+        if self._rows is not None:
+            rows = _merge_sorted(self._rows[~self._rows['inspection_date'].dt.year.isin(years).to_numpy()], incoming)
+            return CamisIndex(rows, visits, restaurants, updated)
+
+        # The new rows are kept in memory, replacing those of their years, until the rows are first used
+        recent = incoming
+        if self._recent_rows is not None:
+            recent = _merge_sorted(self._recent_rows[~self._recent_rows['inspection_date'].dt.year.isin(years).to_numpy()],
+                                   incoming)
+        return CamisIndex(None, visits, restaurants, updated, self._directory, (self._recent_years | set(years), recent))
+
+    # Function to write the index into the dataset root. The rows are stored as one file per inspection year, so
+    # after an update only the files of the `years` that changed are rewritten (all years by default).
+    def save(self, root=snapshot.DATASET_ROOT, years=None):
+        directory = os.path.join(root, INDEX_DIR)
+        os.makedirs(directory, exist_ok=True)
+
+        # Gather the rows of the years to write by year in one stable pass, keeping each year sorted by camis.
+        # Writing only years replaced since the index was loaded needs none of the other years' rows.
+        years = sorted(int(year) for year in (self.years if years is None else years))
+        source = self._recent_rows if self._rows is None and set(years) <= self._recent_years else self.rows
+        row_years = source['inspection_date'].dt.year.to_numpy()
+        selected = np.flatnonzero(np.isin(row_years, years))
+        selected = selected[np.argsort(row_years[selected], kind='stable')]
+        by_year = source.iloc[selected]
+        bounds = np.searchsorted(row_years[selected], years + [max(years, default=0) + 1])
+
+        stale = [name for name in os.listdir(directory) if name.startswith('rows-')]
+        for year, start, stop in zip(years, bounds[:-1], bounds[1:]):
+            path = os.path.join(directory, f'rows-{year}.parquet')
+            if str(year) in self.years:
+                by_year.iloc[start:stop].to_parquet(path, index=False)
+            elif os.path.isfile(path):
+                os.remove(path)
+        for name in stale:
+            if name[len('rows-'):-len('.parquet')] not in self.years:
+                os.remove(os.path.join(directory, name))
+
+        self.visits.to_parquet(os.path.join(directory, 'visits.parquet'), index=False)
+        self.restaurants.to_parquet(os.path.join(directory, 'restaurants.parquet'), index=False)
+        with open(os.path.join(directory, '_index.json'), 'w') as f:
+            json.dump({'years': self.years}, f, indent=2, sort_keys=True)
+
+# Function to check whether the dataset has a saved index.
+def has_index(root=snapshot.DATASET_ROOT):
+    return os.path.isfile(os.path.join(root, INDEX_DIR, '_index.json'))
+
+# Function to load a saved index, or return None if the dataset has none. Only the rollups are read here; the
+# rows are read when first used.
+def load_index(root=snapshot.DATASET_ROOT):
+    if not has_index(root):
+        return None
+
+    directory = os.path.join(root, INDEX_DIR)
+    with open(os.path.join(directory, '_index.json')) as f:
+        years = json.load(f)['years']
+    visits = pd.read_parquet(os.path.join(directory, 'visits.parquet'))
+    restaurants = pd.read_parquet(os.path.join(directory, 'restaurants.parquet'))
+    return CamisIndex(None, visits, restaurants, years, directory)
+
+# Function to build the index for every stored year and save it with the dataset.
+def build_index(root=snapshot.DATASET_ROOT):
+    manifest = snapshot.load_manifest(root)
+    years = snapshot.stored_years(root)
+    df = snapshot.read_partitions(min(years), max(years), root) if years else snapshot.read_partitions(0, 0, root)
+    index = CamisIndex.build(df, {str(year): manifest['years'][str(year)] for year in years})
+    index.save(root)
+    return index
+
+# Function to bring a saved index up to date with the dataset, re-reading only the years whose manifest entry
+# changed (new, re-fetched or synced years) and dropping years no longer stored. Builds the index if missing.
+def refresh_index(root=snapshot.DATASET_ROOT):
+    index = load_index(root)
+    if index is None:
+        return build_index(root)
+
+    stored = snapshot.load_manifest(root)['years']
+    changed = [int(year) for year, entry in stored.items() if index.years.get(year) != entry]
+    removed = [int(year) for year in index.years if year not in stored]
+    if not changed and not removed:
+        return index
+
+    frames = [snapshot.read_partitions(year, year, root) for year in changed]
+    df = snapshot.coerce_to_schema(pd.concat(frames, ignore_index=True)) if frames else index.rows.iloc[:0]
+    index = index.update(df, changed + removed, stored)
+    index.years = {year: entry for year, entry in index.years.items() if year in stored}
+    index.save(root, changed + removed)
+    return index
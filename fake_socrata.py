@@ -0,0 +1,340 @@
+# Import necessary libraries
+import bisect
+import csv
+import io
+import json
+import random
+import re
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+# ----------------------------------------------------------------------------------------------------------
+# Local Socrata Stand-in
+# A small threaded HTTP server that serves canned rows as Socrata-style JSON pages, so the acquire module
+# can be exercised and benchmarked without touching the real NYC Open Data API.
+# __________________________________________________________________________________________________________
+
+# Inspection types cycled through by make_rows(), including the ones the Prepare section removes
+INSPECTION_TYPES = [
+    'Cycle Inspection / Initial Inspection', 'Cycle Inspection / Re-inspection', 'Cycle Inspection / Initial Inspection',
+    'Cycle Inspection / Re-inspection', 'Pre-permit (Operational) / Initial Inspection',
+    'Pre-permit (Operational) / Re-inspection', 'Cycle Inspection / Reopening Inspection',
+    'Administrative Miscellaneous / Initial Inspection', 'Smoke-Free Air Act / Initial Inspection',
+    'Calorie Posting / Initial Inspection', 'Trans Fat / Initial Inspection', 'Cycle Inspection / Initial Inspection',
+]
+
+# Function to build synthetic inspection rows that look like the 43nn-pn8j dataset. As on the real API, null
+# fields (such as grades of ungraded inspections) are left out of a row rather than sent as null.
+def make_rows(n_rows):
+    boros = ['Manhattan', 'Brooklyn', 'Queens', 'Bronx', 'Staten Island']
+    rows = []
+    for i in range(n_rows):
+        row = {
+            ':id': f'row-{i:08d}',
+            'camis': str(40000000 + i // 5),
+            'dba': f'RESTAURANT {i // 5}',
+            'boro': boros[i % len(boros)],
+            'inspection_date': f'{2015 + i % 9}-{1 + i % 12:02d}-{1 + i % 28:02d}T00:00:00.000',
+            'record_date': '2023-12-01T06:00:08.000',
+            'inspection_type': INSPECTION_TYPES[i % len(INSPECTION_TYPES)],
+            'action': 'Violations were cited in the following area(s).',
+            'critical_flag': 'Critical' if i % 2 else 'Not Critical',
+            'violation_code': f'0{2 + i % 8}{"ABCDEFGH"[i % 8]}',
+            'violation_description': 'Cold TCS food item held above 41 °F; smoked or processed fish held above 38 °F.',
+            'score': str(i % 40),
+        }
+        if i % 3 == 0:
+            row['grade'] = 'ABC'[i % 9 // 3]
+            row['grade_date'] = row['inspection_date']
+        rows.append(row)
+    return rows
+
+# Regular expression splitting a SoQL $where clause into tokens
+_TOKEN = re.compile(r"""\s*(?:('(?:[^']|'')*')|("[^"]*")|(>=|<=|!=|[=<>(),])|([:\w.]+))""")
+
+# Function to read a value as a number where possible, since the API sends numbers as strings.
+def _number(value):
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+# Class parsing the subset of SoQL $where used by the acquire module (and/or/not, parentheses, comparisons,
+# between, in, is [not] null, starts_with and true) into a predicate over a row dict.
+class WhereClause:
+    def __init__(self, text):
+        self.tokens = []
+        position = 0
+        text = text.strip()
+        while position < len(text):
+            match = _TOKEN.match(text, position)
+            if not match:
+                raise ValueError(f'Cannot parse $where at: {text[position:]}')
+            single, double, symbol, word = match.groups()
+            if single is not None:
+                self.tokens.append(('value', single[1:-1].replace("''", "'")))
+            elif double is not None:
+                self.tokens.append(('value', double[1:-1]))
+            elif symbol is not None:
+                self.tokens.append(('symbol', symbol))
+            else:
+                self.tokens.append(('word', word))
+            position = match.end()
+        self.position = 0
+        self.predicate = self._or()
+
+    def __call__(self, row):
+        return self.predicate(row)
+
+    def _peek(self, word=None):
+        if self.position >= len(self.tokens):
+            return None
+        kind, value = self.tokens[self.position]
+        if word is None:
+            return value
+        return value if kind != 'value' and value.lower() == word else None
+
+    def _take(self):
+        self.position += 1
+        return self.tokens[self.position - 1][1]
+
+    def _or(self):
+        terms = [self._and()]
+        while self._peek('or'):
+            self._take()
+            terms.append(self._and())
+        return terms[0] if len(terms) == 1 else lambda row: any(term(row) for term in terms)
+
+    def _and(self):
+        factors = [self._not()]
+        while self._peek('and'):
+            self._take()
+            factors.append(self._not())
+        return factors[0] if len(factors) == 1 else lambda row: all(factor(row) for factor in factors)
+
+    def _not(self):
+        if self._peek('not'):
+            self._take()
+            inner = self._not()
+            return lambda row: not inner(row)
+        if self._peek('('):
+            self._take()
+            inner = self._or()
+            self._take()
+            return inner
+        return self._predicate()
+
+    def _predicate(self):
+        name = self._take()
+        if name.lower() == 'true':
+            return lambda row: True
+        if name.lower() == 'starts_with':
+            self._take()
+            column = self._take()
+            self._take()
+            prefix = self._take()
+            self._take()
+            return lambda row: row.get(column) is not None and row[column].startswith(prefix)
+
+        column = name
+        if self._peek('is'):
+            self._take()
+            negate = bool(self._peek('not')) and self._take()
+            self._take()
+            return (lambda row: column in row) if negate else (lambda row: column not in row)
+        if self._peek('between'):
+            self._take()
+            low = self._take()
+            self._take()
+            high = self._take()
+            return lambda row: row.get(column) is not None and low <= row[column] <= high
+        if self._peek('in'):
+            self._take()
+            self._take()
+            values = set()
+            while self._peek() != ')':
+                values.add(self._take())
+                if self._peek(','):
+                    self._take()
+            self._take()
+            return lambda row: row.get(column) in values
+
+        operator = self._take()
+        value = _number(self._take())
+        compare = {'=': lambda a: a == value, '!=': lambda a: a != value, '<': lambda a: a < value,
+                   '<=': lambda a: a <= value, '>': lambda a: a > value, '>=': lambda a: a >= value}[operator]
+        return lambda row: row.get(column) is not None and compare(_number(row[column]) if isinstance(value, float) else row[column])
+
+
+# Class of HTTP server that does not report connections dropped by clients that timed out and retried.
+class _QuietServer(ThreadingHTTPServer):
+    def handle_error(self, request, client_address):
+        if not isinstance(sys.exc_info()[1], (BrokenPipeError, ConnectionResetError)):
+            super().handle_error(request, client_address)
+
+
+# Class holding the canned rows and counters shared by every request handler.
+# Faults can be injected to exercise retries: each request is throttled (429 with Retry-After), fails (500),
+# is delayed by `slow_seconds` or has its connection dropped half way through the body with the given
+# probabilities, and requests numbered within `outage`
+# (a (first, last) pair, counting from 0) always fail, simulating the server going down mid-run.
+# `offset_cost` is the time in seconds spent per row skipped by $offset, mimicking how deep offsets slow
+# down on the real API. Rows must be sorted by :id, which make_rows() guarantees. The bytes of every
+# response body are counted in `bytes_sent`.
+class FakeSocrataServer:
+    def __init__(self, rows, host='127.0.0.1', port=0, throttle_rate=0.0, error_rate=0.0, slow_rate=0.0,
+                 slow_seconds=1.0, cut_rate=0.0, retry_after=0, outage=None, offset_cost=0.0, seed=0):
+        self.rows = rows
+        self.columns = list(dict.fromkeys(key for row in rows for key in row if key != ':id'))
+        self.offset_cost = offset_cost
+        self.bytes_sent = 0
+        self._filtered = {}
+        self.requests = []
+        self.throttle_rate = throttle_rate
+        self.error_rate = error_rate
+        self.slow_rate = slow_rate
+        self.slow_seconds = slow_seconds
+        self.cut_rate = cut_rate
+        self.retry_after = retry_after
+        self.outage = outage
+        self.faults = {'throttled': 0, 'errors': 0, 'slow': 0, 'cut': 0}
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._server = _QuietServer((host, port), self._make_handler())
+        self._server.daemon_threads = True
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._server.server_address[:2]
+        return f'http://{host}:{port}/resource/43nn-pn8j.json'
+
+    # Function to return the rows matching a $where clause and their ids. The `:id > "..."` condition of keyset
+    # pagination is left out of the clause and applied by binary search over the ids, so the filtered rows
+    # can be cached across the pages of a pull.
+    def _matching(self, where):
+        where = re.sub(r':id > "[^"]*"', 'true', where)
+        with self._lock:
+            if where not in self._filtered:
+                rows = list(filter(WhereClause(where), self.rows)) if where else self.rows
+                self._filtered[where] = (rows, [row[':id'] for row in rows])
+            return self._filtered[where]
+
+    # Function to select the columns for one request: $select in order, with * expanding to every data column.
+    def selected_columns(self, params):
+        columns = []
+        for name in params.get('$select', '*').split(','):
+            columns.extend(self.columns if name == '*' else [name])
+        return columns
+
+    # Function to write a page as CSV with a header row, leaving null fields empty as the real CSV endpoint does.
+    def page_csv(self, params):
+        buffer = io.StringIO()
+        writer = csv.DictWriter(buffer, self.selected_columns(params), restval='', extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(self.page(params))
+        return buffer.getvalue()
+
+    # Function to select the rows for one request from its query parameters. :id is only returned when
+    # $select asks for it, as on the real API.
+    def page(self, params):
+        offset = int(params.get('$offset', 0))
+        limit = int(params.get('$limit', 1000))
+        rows, ids = self._matching(params.get('$where', ''))
+
+        start = 0
+        after = re.search(r':id > "([^"]+)"', params.get('$where', ''))
+        if after:
+            start = bisect.bisect_right(ids, after.group(1))
+
+        if self.offset_cost:
+            time.sleep(offset * self.offset_cost)
+
+        rows = rows[start + offset:start + offset + limit]
+        selected = params.get('$select', '*').split(',')
+        if '*' in selected:
+            keep = None if ':id' in selected else lambda key: key != ':id'
+        else:
+            keep = set(selected).__contains__
+        return rows if keep is None else [{key: value for key, value in row.items() if keep(key)} for row in rows]
+
+    # Function to choose the fault (if any) for the request with the given number.
+    def _pick_fault(self, number):
+        if self.outage and self.outage[0] <= number <= self.outage[1]:
+            return 'errors'
+        draw = self._random.random()
+        for fault, rate in (('throttled', self.throttle_rate), ('errors', self.error_rate), ('slow', self.slow_rate),
+                            ('cut', self.cut_rate)):
+            if draw < rate:
+                return fault
+            draw -= rate
+        return None
+
+    def _make_handler(self):
+        fake = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                query = parse_qs(urlsplit(self.path).query, keep_blank_values=True)
+                params = {key: values[-1] for key, values in query.items()}
+                with fake._lock:
+                    number = len(fake.requests)
+                    fake.requests.append(params)
+                    fault = fake._pick_fault(number)
+                    if fault:
+                        fake.faults[fault] += 1
+
+                if fault == 'throttled':
+                    return self._send(429, b'{"message": "Too many requests"}', {'Retry-After': str(fake.retry_after)})
+                if fault == 'errors':
+                    return self._send(500, b'{"message": "Internal error"}')
+                if fault == 'slow':
+                    time.sleep(fake.slow_seconds)
+
+                if urlsplit(self.path).path.endswith('.csv'):
+                    body = fake.page_csv(params).encode()
+                else:
+                    body = json.dumps(fake.page(params)).encode()
+                with fake._lock:
+                    fake.bytes_sent += len(body)
+                self._send(200, body, cut=fault == 'cut')
+
+            # Function to send a response; a cut response announces the full body but sends only half of it
+            # before the connection is closed.
+            def _send(self, status, body, headers=None, cut=False):
+                self.send_response(status)
+                self.send_header('Content-Type', 'text/csv' if urlsplit(self.path).path.endswith('.csv') else 'application/json')
+                self.send_header('Content-Length', str(len(body)))
+                for name, value in (headers or {}).items():
+                    self.send_header(name, value)
+                self.end_headers()
+                if cut:
+                    self.wfile.write(body[:len(body) // 2])
+                    self.close_connection = True
+                    return
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        return Handler
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
@@ -0,0 +1,207 @@
+# Import necessary libraries
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+import camis_index
+import snapshot
+
+# ----------------------------------------------------------------------------------------------------------
+# Restaurant Feature Store
+# This script keeps per-restaurant history features in the dataset root, as of every inspection visit:
+#   inspections                   visits so far
+#   last_score                    score of the visit
+#   rolling_mean_score            mean score over the last WINDOW visits
+#   critical_last_n               critical violations over the last WINDOW visits
+#   days_since_previous           days since the restaurant's previous visit
+#   initial_to_reinspection_days  days from the latest Initial Inspection to the Re-inspection after it
+#
+# Each row holds the features known right after a visit, so reading "as of" a date never sees later
+# inspections. The store is a set of Parquet part files plus a table of restaurants holding a fingerprint of
+# each one's visit history and the part its current rows are in. A refresh recomputes only the restaurants
+# whose history changed and appends their rows as one new part, which supersedes their older rows. Parts
+# left without current rows are deleted, and the store is compacted into one part once it has too many.
+# __________________________________________________________________________________________________________
+
+# Directory of the store inside the dataset root
+FEATURE_DIR = '_feature_store'
+
+# Number of part files after which a refresh compacts the store into one
+COMPACT_PARTS = 16
+
+# Number of most recent visits the rolling features cover
+WINDOW = 3
+
+# Visit columns that define a restaurant's history (offsets into the index rows are left out)
+HISTORY_COLUMNS = ['camis', 'inspection_date', 'score', 'violations', 'critical', 'action', 'inspection_type']
+
+# Function to sum each visit's value with those of the restaurant's previous visits, over at most `window`
+# visits. `start` holds, for every visit, the position of its restaurant's first visit.
+def _windowed(values, start, window):
+    totals = np.concatenate([[0.0], np.cumsum(values)])
+    position = np.arange(len(values))
+    return totals[position + 1] - totals[np.maximum(position - window + 1, start)]
+
+# Function to compute the features of every visit in a visit table sorted by camis and inspection date.
+def visit_features(visits, window=WINDOW):
+    n = len(visits)
+    camis = visits['camis'].to_numpy()
+    dates = visits['inspection_date'].to_numpy()
+    position = np.arange(n)
+
+    first = np.ones(n, dtype=bool)
+    first[1:] = camis[1:] != camis[:-1]
+    start = np.maximum.accumulate(np.where(first, position, 0)) if n else position
+
+    score = visits['score'].to_numpy(dtype='float64', na_value=np.nan)
+    scored = ~np.isnan(score)
+    scored_visits = _windowed(scored.astype('float64'), start, window)
+    rolling_mean = np.divide(_windowed(np.nan_to_num(score), start, window), scored_visits,
+                             out=np.full(n, np.nan), where=scored_visits > 0)
+
+    days = dates.astype('datetime64[D]').astype('int64')
+    previous = np.where(first, np.nan, days - days[np.maximum(position - 1, 0)])
+
+    # Days from the latest Initial Inspection to each Re-inspection, carried forward to later visits
+    inspection_type = visits['inspection_type'].astype('string').fillna('')
+    initial = inspection_type.str.contains('Initial Inspection', regex=False).to_numpy(dtype=bool)
+    reinspection = inspection_type.str.contains('Re-inspection', regex=False).to_numpy(dtype=bool)
+    last_initial = np.maximum.accumulate(np.where(initial, position, -1)) if n else position
+    paired = reinspection & (last_initial >= start)
+    gap = np.where(paired, days - days[np.maximum(last_initial, 0)], np.nan)
+    last_gap = np.maximum.accumulate(np.where(paired, position, -1)) if n else position
+    initial_to_reinspection = np.where(last_gap >= start, gap[np.maximum(last_gap, 0)], np.nan)
+
+    return pd.DataFrame({
+        'camis': camis,
+        'inspection_date': dates,
+        'inspections': position - start + 1,
+        'last_score': score,
+        'rolling_mean_score': rolling_mean,
+        'critical_last_n': _windowed(visits['critical'].to_numpy(dtype='float64'), start, window).astype(np.int64),
+        'days_since_previous': previous,
+        'initial_to_reinspection_days': initial_to_reinspection,
+    })
+
+# Function to fingerprint every restaurant's visit history in an index: the sum of its visits' row hashes.
+def fingerprints(index):
+    hashes = pd.util.hash_pandas_object(index.visits[HISTORY_COLUMNS], index=False).to_numpy()
+    visit_start = index.restaurants['visit_start'].to_numpy()
+    return pd.DataFrame({
+        'camis': index.restaurants['camis'].to_numpy(),
+        'fingerprint': np.add.reduceat(hashes, visit_start) if len(visit_start) else hashes[:0],
+    })
+
+# Function to compute the features of some restaurants (positions in index.restaurants) from their visits.
+def _restaurant_features(index, positions):
+    restaurants = index.restaurants.iloc[positions]
+    counts = restaurants['inspections'].to_numpy()
+    starts = np.repeat(restaurants['visit_start'].to_numpy() - np.cumsum(counts) + counts, counts)
+    visits = index.visits.iloc[starts + np.arange(counts.sum())]
+    return visit_features(visits)
+
+# Function to return the path of a part file.
+def _part_path(directory, part):
+    return os.path.join(directory, f'part-{part:06d}.parquet')
+
+# Function to return the number of the next part file to write.
+def _next_part(directory):
+    parts = [int(name[len('part-'):-len('.parquet')]) for name in os.listdir(directory) if name.startswith('part-')]
+    return max(parts, default=-1) + 1
+
+# Function to write the restaurants table and delete the part files it no longer points to.
+def _commit(restaurants, directory):
+    restaurants.to_parquet(os.path.join(directory, 'restaurants.parquet'), index=False)
+    live = set(restaurants['part'].unique().tolist())
+    for name in os.listdir(directory):
+        if name.startswith('part-') and int(name[len('part-'):-len('.parquet')]) not in live:
+            os.remove(os.path.join(directory, name))
+
+# Function to check whether the dataset has a feature store.
+def has_store(root=snapshot.DATASET_ROOT):
+    return os.path.isfile(os.path.join(root, FEATURE_DIR, 'restaurants.parquet'))
+
+# Function to build the whole store from a restaurant index, replacing any existing one.
+def build_store(index, root=snapshot.DATASET_ROOT):
+    directory = os.path.join(root, FEATURE_DIR)
+    os.makedirs(directory, exist_ok=True)
+
+    part = _next_part(directory)
+    visit_features(index.visits).to_parquet(_part_path(directory, part), index=False)
+    _commit(fingerprints(index).assign(part=part), directory)
+    return len(index.restaurants)
+
+# Function to bring the store up to date with a restaurant index, recomputing only the restaurants whose
+# visit history changed (or that are new or gone). Builds the store if the dataset has none. Returns the
+# number of restaurants recomputed.
+def refresh_store(index, root=snapshot.DATASET_ROOT):
+    if not has_store(root):
+        return build_store(index, root)
+
+    directory = os.path.join(root, FEATURE_DIR)
+    current = fingerprints(index).set_index('camis')['fingerprint']
+    stored = pd.read_parquet(os.path.join(directory, 'restaurants.parquet')).set_index('camis')
+    common = current.index.intersection(stored.index)
+    differs = current[common].to_numpy() != stored.loc[common, 'fingerprint'].to_numpy()
+    stale = np.sort(np.concatenate([common[differs], current.index.difference(stored.index),
+                                    stored.index.difference(current.index)]))
+    if not len(stale):
+        return 0
+
+    # The recomputed rows go to a new part; unchanged restaurants keep pointing at their old parts
+    part = _next_part(directory)
+    changed = stale[np.isin(stale, current.index)]
+    if len(changed):
+        _restaurant_features(index, index.positions(changed)).to_parquet(_part_path(directory, part), index=False)
+    restaurants = current.to_frame().assign(part=stored['part'].reindex(current.index).to_numpy())
+    restaurants.loc[changed, 'part'] = part
+    restaurants = restaurants.astype({'part': 'int64'}).reset_index()
+    _commit(restaurants, directory)
+
+    if restaurants['part'].nunique() > COMPACT_PARTS:
+        compacted = read_features(root)
+        compacted.to_parquet(_part_path(directory, part + 1), index=False)
+        _commit(restaurants.assign(part=part + 1), directory)
+    return len(stale)
+
+# Function to read the current rows of the store, or of the given restaurants only, sorted by camis and date.
+def read_features(root=snapshot.DATASET_ROOT, camis=None):
+    directory = os.path.join(root, FEATURE_DIR)
+    owners = pd.read_parquet(os.path.join(directory, 'restaurants.parquet'), columns=['camis', 'part'])
+    if camis is not None:
+        owners = owners[np.isin(owners['camis'].to_numpy(), np.asarray(camis))]
+
+    frames = []
+    for part, restaurants in owners.groupby('part'):
+        rows = pd.read_parquet(_part_path(directory, part))
+        frames.append(rows[np.isin(rows['camis'].to_numpy(), restaurants['camis'].to_numpy())])
+    if not frames:
+        return visit_features(pd.DataFrame(columns=HISTORY_COLUMNS))
+
+    features = pd.concat(frames, ignore_index=True)
+    return features.sort_values(['camis', 'inspection_date'], kind='stable', ignore_index=True)
+
+# Function to read point-in-time features for (camis, as_of) pairs: the features after the restaurant's latest
+# visit strictly before `as_of`, so a training label dated `as_of` never sees its own or later inspections.
+# Pairs with no earlier visit get nulls.
+def features_as_of(keys, root=snapshot.DATASET_ROOT):
+    features = read_features(root, keys['camis'].unique())
+    keys = keys[['camis', 'as_of']].astype({'camis': features['camis'].dtype})
+    keys['as_of'] = pd.to_datetime(keys['as_of']).astype('datetime64[us]')
+    features['inspection_date'] = features['inspection_date'].astype('datetime64[us]')
+    order = keys.sort_values('as_of', kind='stable')
+    found = pd.merge_asof(order, features.sort_values('inspection_date', kind='stable'), left_on='as_of',
+                          right_on='inspection_date', by='camis', allow_exact_matches=False)
+    return found.set_axis(order.index).loc[keys.index]
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Build or refresh the per-restaurant feature store.')
+    parser.add_argument('--rebuild', action='store_true', help='recompute every restaurant')
+    args = parser.parse_args()
+    index = camis_index.refresh_index()
+    if args.rebuild:
+        print(f'Feature store rebuilt: {build_store(index):,} restaurants.')
+    else:
+        print(f'Feature store refreshed: {refresh_store(index):,} restaurants recomputed.')
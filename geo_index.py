@@ -0,0 +1,123 @@
+# Import necessary libraries
+import numpy as np
+import pandas as pd
+
+import camis_index
+import snapshot
+
+# ----------------------------------------------------------------------------------------------------------
+# Nearby Restaurants
+# This script builds an in-memory spatial index over the restaurants of the camis index, for "what is near
+# this point" questions. Coordinates are projected to metres on a local flat plane around New York (the
+# error is well under 1% across the city) and bucketed into a square grid. Restaurants are sorted by grid
+# cell, so the restaurants of a run of cells in one grid column are one contiguous slice. A radius or
+# bounding-box query binary-searches a handful of such slices and checks exact distances only for them.
+# __________________________________________________________________________________________________________
+
+# Reference latitude of the projection (central New York)
+REFERENCE_LATITUDE = 40.7
+
+# Metres per degree of latitude, and of longitude at the reference latitude
+METRES_PER_DEGREE = 111_320.0
+METRES_PER_DEGREE_LONGITUDE = METRES_PER_DEGREE * np.cos(np.radians(REFERENCE_LATITUDE))
+
+# Side of a grid cell in metres
+CELL_METRES = 250.0
+
+# Columns returned for every restaurant found by a query
+RESULT_COLUMNS = ['camis', 'dba', 'boro', 'latitude', 'longitude', 'inspections', 'last_inspection', 'last_score',
+                  'last_action', 'critical_count']
+
+# Function to project latitude/longitude in degrees to x/y in metres on the local plane.
+def project(latitude, longitude):
+    x = np.asarray(longitude, dtype='float64') * METRES_PER_DEGREE_LONGITUDE
+    y = np.asarray(latitude, dtype='float64') * METRES_PER_DEGREE
+    return x, y
+
+# Class holding restaurants sorted by grid cell, with radius and bounding-box queries.
+class GeoIndex:
+    def __init__(self, restaurants, cell_metres=CELL_METRES):
+        self.cell_metres = cell_metres
+
+        # Restaurants without coordinates (missing, or 0 in the source data) cannot be placed on the grid
+        located = restaurants['latitude'].notna() & restaurants['longitude'].notna() & (restaurants['latitude'] != 0)
+        restaurants = restaurants[located.to_numpy()]
+
+        x, y = project(restaurants['latitude'], restaurants['longitude'])
+        self.origin = (x.min(), y.min()) if len(x) else (0.0, 0.0)
+        column, row = self._cells(x, y)
+        self.rows_per_column = int(row.max()) + 1 if len(row) else 1
+        keys = column * self.rows_per_column + row
+
+        order = np.argsort(keys, kind='stable')
+        self.keys = keys[order]
+        self.x, self.y = x[order], y[order]
+
+        # Results are numpy-backed (text as object, nullable scores as float), so taking a few rows is cheap
+        restaurants = restaurants.iloc[order][RESULT_COLUMNS].reset_index(drop=True)
+        self.restaurants = restaurants.astype({column: object if dtype.kind not in 'iufM' else 'float64'
+                                               for column, dtype in restaurants.dtypes.items()
+                                               if not isinstance(dtype, np.dtype)})
+
+        # Radius results carry their distance; overwriting an existing column is much cheaper than adding one
+        self._with_distance = self.restaurants.assign(distance_m=np.nan)
+
+    # Function to build the index from the latest row of every restaurant in a camis index.
+    @classmethod
+    def from_camis_index(cls, index, cell_metres=CELL_METRES):
+        latest = index.rows.iloc[index.restaurants['row_stop'].to_numpy() - 1].reset_index(drop=True)
+        summary = index.restaurants[['inspections', 'last_inspection', 'last_score', 'last_action', 'critical_count']]
+        restaurants = pd.concat([latest[['camis', 'dba', 'boro', 'latitude', 'longitude']], summary], axis=1)
+        return cls(restaurants, cell_metres)
+
+    def __len__(self):
+        return len(self.restaurants)
+
+    # Function to find the grid column and row of projected points.
+    def _cells(self, x, y):
+        column = np.floor((x - self.origin[0]) / self.cell_metres).astype(np.int64)
+        row = np.floor((y - self.origin[1]) / self.cell_metres).astype(np.int64)
+        return column, row
+
+    # Function to return the positions of the restaurants in the cells of a projected box, one slice per grid
+    # column the box spans.
+    def _candidates(self, x0, y0, x1, y1):
+        (column0, column1), (row0, row1) = self._cells(np.array([x0, x1]), np.array([y0, y1]))
+        row0, row1 = max(row0, 0), min(row1, self.rows_per_column - 1)
+        if row0 > row1:
+            return np.zeros(0, dtype=np.int64)
+
+        columns = np.arange(column0, column1 + 1)
+        starts = np.searchsorted(self.keys, columns * self.rows_per_column + row0, side='left')
+        stops = np.searchsorted(self.keys, columns * self.rows_per_column + row1, side='right')
+        if not (stops > starts).any():
+            return np.zeros(0, dtype=np.int64)
+        return np.concatenate([np.arange(start, stop) for start, stop in zip(starts, stops) if stop > start])
+
+    # Function to find restaurants within `metres` of a point, nearest first, with a distance_m column.
+    def within_radius(self, latitude, longitude, metres):
+        x, y = project(latitude, longitude)
+        candidates = self._candidates(x - metres, y - metres, x + metres, y + metres)
+        distance = np.hypot(self.x[candidates] - x, self.y[candidates] - y)
+        inside = distance <= metres
+        order = np.argsort(distance[inside], kind='stable')
+        found = self._with_distance.take(candidates[inside][order])
+        found.index = pd.RangeIndex(len(found))
+        found.isetitem(len(RESULT_COLUMNS), distance[inside][order])
+        return found
+
+    # Function to find restaurants inside a latitude/longitude bounding box.
+    def within_bbox(self, south, west, north, east):
+        x0, y0 = project(south, west)
+        x1, y1 = project(north, east)
+        candidates = self._candidates(x0, y0, x1, y1)
+        x, y = self.x[candidates], self.y[candidates]
+        inside = (x >= x0) & (x <= x1) & (y >= y0) & (y <= y1)
+        found = self.restaurants.take(candidates[inside])
+        found.index = pd.RangeIndex(len(found))
+        return found
+
+# Function to build the spatial index for a dataset, from its saved camis index (refreshed first, or built if
+# the dataset has none).
+def build_geo_index(root=snapshot.DATASET_ROOT, cell_metres=CELL_METRES):
+    return GeoIndex.from_camis_index(camis_index.refresh_index(root), cell_metres)
@@ -0,0 +1,104 @@
+# Import necessary libraries
+import os
+import threading
+from collections import OrderedDict
+
+import pandas as pd
+
+# ----------------------------------------------------------------------------------------------------------
+# DataFrame Loader
+# This module keeps parsed DataFrames in a process-wide LRU cache so that Streamlit reruns and new sessions
+# reuse them instead of re-reading and re-parsing the same files. Entries are keyed on the file's path,
+# modification time and size, so editing a file on disk invalidates its cached frame automatically.
+# Frames returned from the cache are shared between sessions and must be treated as read-only.
+# __________________________________________________________________________________________________________
+
+# Default memory budget for all cached frames combined (in bytes)
+DEFAULT_MAX_BYTES = int(os.environ.get('LOADER_MAX_BYTES', 256 * 1024 * 1024))
+
+
+# Class holding parsed frames in least-recently-used order within a fixed memory budget.
+class DataFrameCache:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.current_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    # Look up a frame by key, marking it as most recently used.
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[0]
+
+    # Store a frame, evicting the least recently used entries until it fits in the budget.
+    def put(self, key, df):
+        size = int(df.memory_usage(deep=True).sum())
+
+        with self._lock:
+            if key in self._entries:
+                self.current_bytes -= self._entries.pop(key)[1]
+
+            # Frames larger than the whole budget are returned to the caller but never cached
+            if size > self.max_bytes:
+                return
+
+            while self._entries and self.current_bytes + size > self.max_bytes:
+                _, (_, evicted_size) = self._entries.popitem(last=False)
+                self.current_bytes -= evicted_size
+
+            self._entries[key] = (df, size)
+            self.current_bytes += size
+
+    # Drop entries for a path, keeping those whose (mtime, size) still match `current` if given.
+    def invalidate(self, path, current=None):
+        with self._lock:
+            for key in [k for k in self._entries if k[0] == path and k[1:3] != current]:
+                self.current_bytes -= self._entries.pop(key)[1]
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self.current_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+
+# Shared cache used by every caller in the process
+_cache = DataFrameCache()
+
+
+# Function to build the cache key for a file from its absolute path, mtime and size.
+def _file_key(file_name, read_kwargs):
+    path = os.path.abspath(file_name)
+    stat = os.stat(path)
+    options = tuple(sorted((k, tuple(v) if isinstance(v, list) else v) for k, v in read_kwargs.items()))
+    return (path, stat.st_mtime_ns, stat.st_size, options)
+
+
+# Function to load a CSV file through the shared cache, parsing it only if it is new or has changed.
+def load_csv(file_name, **read_kwargs):
+    key = _file_key(file_name, read_kwargs)
+
+    df = _cache.get(key)
+    if df is not None:
+        return df
+
+    # The file is new or was modified, so any older versions of it can go
+    _cache.invalidate(key[0], current=key[1:3])
+    df = pd.read_csv(key[0], **read_kwargs)
+    _cache.put(key, df)
+    return df
+
+
+# Function to expose the shared cache (for stats, tuning the budget or clearing it).
+def get_cache():
+    return _cache
@@ -0,0 +1,127 @@
+# Import necessary libraries
+import argparse
+import re
+
+import numpy as np
+import pandas as pd
+
+import snapshot
+
+# ----------------------------------------------------------------------------------------------------------
+# Name and Address Normalization
+# This script turns raw restaurant names (dba), building numbers and street names into canonical forms, so
+# the same place written different ways compares equal:
+#   dba       upper case, collapsed whitespace, straight apostrophes, backslashes as slashes
+#                 'PAISANOS BURGERS\MELT' -> 'PAISANOS BURGERS/MELT'
+#   building  no blanks around Queens-style hyphens or before a letter suffix, '0' as missing
+#                 '136 - 20' -> '136-20', '12 A' -> '12A'
+#   street    collapsed whitespace, spelled-out leading direction and final suffix, ordinal numbers
+#                 'EAST    7 STREET' -> 'EAST 7TH STREET', 'W 34 ST' -> 'WEST 34TH STREET'
+#                 (only the last word is a suffix: 'DR M L KING JR BLVD' -> 'DR M L KING JR BOULEVARD')
+#
+# The same address repeats on every violation row of every visit, so each normalizer only works on the
+# distinct raw values it is given, and remembers their canonical forms across calls: normalizing a chunk
+# costs a lookup per distinct value, plus the rules for values it has never seen.
+# __________________________________________________________________________________________________________
+
+# Canonical forms of street suffixes (and of the abbreviations of Broadway)
+STREET_SUFFIXES = {
+    'ST': 'STREET', 'STR': 'STREET', 'AVE': 'AVENUE', 'AV': 'AVENUE', 'BLVD': 'BOULEVARD', 'RD': 'ROAD',
+    'PL': 'PLACE', 'PKWY': 'PARKWAY', 'PKY': 'PARKWAY', 'DR': 'DRIVE', 'LN': 'LANE', 'HWY': 'HIGHWAY',
+    'SQ': 'SQUARE', 'TPKE': 'TURNPIKE', 'EXPY': 'EXPRESSWAY', 'EXPWY': 'EXPRESSWAY', 'CT': 'COURT',
+    'TER': 'TERRACE', 'TERR': 'TERRACE', 'PLZ': 'PLAZA', 'BWAY': 'BROADWAY', 'BDWY': 'BROADWAY',
+}
+
+# Canonical forms of leading compass directions
+DIRECTIONS = {'E': 'EAST', 'W': 'WEST', 'N': 'NORTH', 'S': 'SOUTH'}
+
+# Street types numbered streets are named with; the number before them gets an ordinal suffix
+NUMBERED_TYPES = ['STREET', 'AVENUE', 'PLACE', 'ROAD', 'DRIVE', 'TERRACE', 'LANE', 'COURT']
+
+# Number of remembered values after which a normalizer forgets all but those of the values being normalized
+CACHE_LIMIT = 1_000_000
+
+SUFFIX_PATTERN = re.compile(r'\b(' + '|'.join(STREET_SUFFIXES) + r')$')
+ORDINAL_PATTERN = re.compile(r'\b(\d+)(?:ST|ND|RD|TH)? (?=(?:' + '|'.join(NUMBERED_TYPES) + r')\b)')
+
+# Function to return a number with its English ordinal suffix ('1' -> '1ST', '12' -> '12TH', '23' -> '23RD').
+def ordinal(number):
+    if number[-2:] in ('11', '12', '13'):
+        return number + 'TH'
+    return number + {'1': 'ST', '2': 'ND', '3': 'RD'}.get(number[-1], 'TH')
+
+# Function to upper-case text and collapse runs of whitespace, with empty results as missing.
+def _clean(values):
+    values = values.str.upper().str.replace(r'\s+', ' ', regex=True).str.strip()
+    return values.mask(values == '')
+
+# Function with the rules for restaurant names.
+def dba_rules(values):
+    values = (values.str.replace('\\', '/', regex=False)
+              .str.replace(r'[‘’`]', "'", regex=True)
+              .str.replace(r'\s*/\s*', '/', regex=True))
+    return _clean(values).str.rstrip(' .,;')
+
+# Function with the rules for building numbers.
+def building_rules(values):
+    values = _clean(values.str.replace(r'[–—]', '-', regex=True))
+    values = values.str.replace(r'\s*-\s*', '-', regex=True).str.replace(r'^(\d+) ([A-Z])$', r'\1\2', regex=True)
+    return values.mask(values.str.fullmatch(r'0+').fillna(False))
+
+# Function with the rules for street names.
+def street_rules(values):
+    values = _clean(values.str.replace(r'[.,]', ' ', regex=True))
+    values = values.str.replace(r'^([EWNS]) (?=\w)', lambda match: DIRECTIONS[match[1]] + ' ', regex=True)
+    values = values.str.replace(r'^ST (?=[A-Z])', 'SAINT ', regex=True)
+    values = values.str.replace(SUFFIX_PATTERN, lambda match: STREET_SUFFIXES[match[1]], regex=True)
+    return values.str.replace(ORDINAL_PATTERN, lambda match: ordinal(match[1]) + ' ', regex=True)
+
+# Class applying normalization rules to the distinct values of a column, and remembering the results by raw
+# value, so repeated values (within a column and across calls) are normalized once.
+class Normalizer:
+    def __init__(self, rules):
+        self.rules = rules
+        self.cache = {}
+
+    # Function to normalize values, returning a string Series aligned with them.
+    def __call__(self, values):
+        values = pd.Series(values)
+        if isinstance(values.dtype, pd.CategoricalDtype):
+            codes, distinct = values.cat.codes.to_numpy(), values.cat.categories.to_numpy(dtype=object)
+        else:
+            codes, distinct = pd.factorize(values)
+            distinct = np.asarray(distinct, dtype=object)
+
+        unseen = [value for value in distinct if value not in self.cache]
+        if unseen:
+            # Past the limit, start over from the values of this call that are already known
+            if len(self.cache) + len(unseen) > CACHE_LIMIT:
+                self.cache = {value: self.cache[value] for value in distinct if value in self.cache}
+            normalized = self.rules(pd.Series(unseen, dtype='string'))
+            self.cache.update(zip(unseen, normalized.to_numpy(dtype=object, na_value=None)))
+
+        canonical = np.array([self.cache[value] for value in distinct] + [None], dtype=object)
+        return pd.Series(canonical[codes], index=values.index, dtype='string')
+
+normalize_dba = Normalizer(dba_rules)
+normalize_building = Normalizer(building_rules)
+normalize_street = Normalizer(street_rules)
+
+# Normalizer of each column it applies to
+NORMALIZERS = {'dba': normalize_dba, 'building': normalize_building, 'street': normalize_street}
+
+# Function to return a copy of a frame with its name and address columns in canonical form.
+def normalize_frame(df, columns=tuple(NORMALIZERS)):
+    df = df.copy()
+    for column in columns:
+        df[column] = NORMALIZERS[column](df[column])
+    return df
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Report how many distinct names and addresses normalization merges.')
+    parser.add_argument('start_year', type=int)
+    parser.add_argument('end_year', type=int)
+    args = parser.parse_args()
+    df = snapshot.read_partitions(args.start_year, args.end_year, columns=list(NORMALIZERS))
+    for column, normalizer in NORMALIZERS.items():
+        print(f'{column:<9} {df[column].nunique():>9,} distinct raw -> {normalizer(df[column]).nunique():>9,} normalized')
@@ -0,0 +1,210 @@
+# Import necessary libraries
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import camis_index
+import geo_index
+import normalize
+
+# ----------------------------------------------------------------------------------------------------------
+# Place Matching
+# This script matches places from a maps export (place_id, name, building, street, zipcode, phone, latitude,
+# longitude) to inspected restaurants (camis). Comparing every place with every restaurant is quadratic, so
+# pairs are only formed inside blocks: restaurants and places sharing a zipcode (or a geohash-style grid cell
+# and its neighbours), plus any pair sharing a phone number, wherever they are.
+#
+# Candidate pairs are scored in one vectorized pass. Names are compared by the Jaccard similarity of their
+# character trigrams, held as fixed-size bitsets so a pair costs a few AND/OR and popcount operations.
+# Phones, building numbers and street names (in the canonical forms of normalize.py) and the distance
+# between coordinates add evidence, and the confidence is the weighted mean of whichever of them both sides
+# have. Each restaurant keeps its best place, if no other restaurant is a better match for it.
+# __________________________________________________________________________________________________________
+
+# Columns a places frame is expected to have (all but place_id and name may be null)
+PLACE_COLUMNS = ['place_id', 'name', 'building', 'street', 'zipcode', 'phone', 'latitude', 'longitude']
+
+# Words left out of names before comparing them
+NAME_STOPWORDS = {'THE', 'AND', 'RESTAURANT', 'INC', 'LLC', 'CORP', 'CO', 'NYC', 'OF'}
+
+# Bits of the trigram bitsets (a multiple of 64)
+SIGNATURE_BITS = 256
+
+# Side in metres of the grid cells used for geohash blocking
+GEOHASH_METRES = 300.0
+
+# Distance in metres at which the distance evidence is halved
+DISTANCE_HALF_METRES = 75.0
+
+# Weights of the evidence behind a match confidence
+WEIGHTS = {'name': 0.45, 'phone': 0.25, 'address': 0.15, 'distance': 0.15}
+
+# Lowest confidence kept as a match
+MIN_CONFIDENCE = 0.5
+
+# Phone recorded for restaurants without one (see prepare.standardize)
+PHONE_PLACEHOLDER = '1000000000'
+
+# Function to normalize names for comparison: upper case, letters and digits only, no common filler words.
+# Each distinct name is normalized once.
+def normalize_names(names):
+    names = pd.Series(names, dtype='string').fillna('')
+    codes, distinct = pd.factorize(names)
+    words = pd.Series(distinct, dtype='string').str.upper().str.replace(r'[^A-Z0-9 ]+', ' ', regex=True).str.split()
+    normalized = np.array([' '.join(word for word in split if word not in NAME_STOPWORDS) for split in words] + [''],
+                          dtype=object)
+    return normalized[codes]
+
+# Function to normalize phone numbers to their last 10 digits, with missing and placeholder numbers as null.
+def normalize_phones(phones):
+    digits = pd.Series(phones, dtype='string').fillna('').str.replace(r'\D', '', regex=True).str[-10:]
+    return digits.mask((digits.str.len() < 10) | (digits == PHONE_PLACEHOLDER)).to_numpy(dtype=object, na_value=None)
+
+# Function to build trigram bitsets for texts: one row of SIGNATURE_BITS // 64 words per text, with the bit of
+# every character trigram of the padded text set. Trigrams are numbered over all texts given together, so
+# texts compared with each other must be signed in the same call.
+def trigram_signatures(texts):
+    codes, distinct = pd.factorize(pd.Series(texts, dtype=object).fillna(''))
+    grams = [[padded[i:i + 3] for i in range(len(padded) - 2)] for padded in (f' {text} ' for text in distinct)]
+    owner = np.repeat(np.arange(len(distinct)), [len(text_grams) for text_grams in grams])
+    bit = pd.factorize(pd.Series([gram for text_grams in grams for gram in text_grams], dtype=object))[0]
+    bit = bit % SIGNATURE_BITS
+
+    signatures = np.zeros((len(distinct) + 1, SIGNATURE_BITS // 64), dtype=np.uint64)
+    np.bitwise_or.at(signatures, (owner, bit // 64), np.left_shift(np.uint64(1), (bit % 64).astype(np.uint64)))
+    return signatures[codes]
+
+# Function to compute the Jaccard similarity of pairs of bitsets (rows of `a` against rows of `b`).
+def jaccard(a, b):
+    union = np.bitwise_count(a | b).sum(axis=1)
+    return np.divide(np.bitwise_count(a & b).sum(axis=1), union, out=np.zeros(len(a)), where=union > 0)
+
+# Function to pair every left position with every right position sharing a block key. Null keys pair nothing.
+def _block_pairs(left_keys, right_keys):
+    left_keys, right_keys = pd.Series(left_keys), pd.Series(right_keys)
+    left_keys, right_keys = left_keys[left_keys.notna()], right_keys[right_keys.notna()]
+    keys = pd.Index(pd.unique(right_keys.to_numpy()))
+    block = keys.get_indexer(left_keys.to_numpy())
+    left_positions = left_keys.index.to_numpy()[block >= 0]
+    block = block[block >= 0]
+
+    # Right positions sorted by block, so each block's places are one slice
+    right_block = keys.get_indexer(right_keys.to_numpy())
+    order = np.argsort(right_block, kind='stable')
+    right_positions = right_keys.index.to_numpy()[order]
+    sizes = np.bincount(right_block, minlength=len(keys))
+    starts = np.concatenate([[0], np.cumsum(sizes)[:-1]]).astype(np.int64)
+
+    counts = sizes[block]
+    left = np.repeat(left_positions, counts)
+    within = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+    return left, right_positions[np.repeat(starts[block], counts) + within]
+
+# Function to return the geohash-style grid cell of every point, as one integer key (null without coordinates).
+def _cells(latitude, longitude, cell_metres, shift=(0, 0)):
+    x, y = geo_index.project(latitude, longitude)
+    column = np.floor(x / cell_metres) + shift[0]
+    row = np.floor(y / cell_metres) + shift[1]
+    located = ~np.isnan(x) & ~np.isnan(y) & (np.asarray(latitude, dtype='float64') != 0)
+    return pd.Series(np.where(located, column * 1_000_000 + row, 0).astype(np.int64), dtype='Int64').where(located)
+
+# Function to find candidate (restaurant, place) position pairs: pairs sharing a block (zipcode, or grid cell
+# with the place in any of the 9 cells around the restaurant's) or a phone number. Pairs are unique.
+def candidate_pairs(restaurants, places, block='zipcode', cell_metres=GEOHASH_METRES):
+    if not len(restaurants) or not len(places):
+        return np.zeros(0, dtype=np.int64), np.zeros(0, dtype=np.int64)
+    pairs = [_block_pairs(normalize_phones(restaurants['phone']), normalize_phones(places['phone']))]
+    if block == 'zipcode':
+        pairs.append(_block_pairs(restaurants['zipcode'].astype('Int64'), places['zipcode'].astype('Int64')))
+    elif block == 'geohash':
+        restaurant_cells = _cells(restaurants['latitude'], restaurants['longitude'], cell_metres)
+        for shift in [(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)]:
+            pairs.append(_block_pairs(restaurant_cells,
+                                      _cells(places['latitude'], places['longitude'], cell_metres, shift)))
+    else:
+        raise ValueError(f"block must be 'zipcode' or 'geohash', not {block!r}")
+
+    # Pairs found by both the phone and the block appear twice; sorting and dropping repeats is cheaper than
+    # np.unique's hashing at this size
+    packed = np.sort(np.concatenate([left * len(places) + right for left, right in pairs]))
+    packed = packed[np.concatenate([[True], packed[1:] != packed[:-1]])]
+    return packed // len(places), packed % len(places)
+
+# Function to number the values of two columns together, so pairs can be compared as integers. Nulls get -1.
+def _shared_codes(restaurant_values, place_values):
+    codes = pd.factorize(np.concatenate([restaurant_values, place_values]), use_na_sentinel=True)[0]
+    return codes[:len(restaurant_values)], codes[len(restaurant_values):]
+
+# Function to score candidate pairs, returning the pair positions with their evidence and confidence.
+def score_pairs(restaurants, places, left, right):
+    names = trigram_signatures(np.concatenate([normalize_names(restaurants['dba']), normalize_names(places['name'])]))
+    streets = trigram_signatures(np.concatenate([normalize.normalize_street(side['street']).to_numpy(
+        dtype=object, na_value='') for side in (restaurants, places)]))
+    name_similarity = jaccard(names[:len(restaurants)][left], names[len(restaurants):][right])
+
+    # Phones count when both sides have one
+    restaurant_phone, place_phone = _shared_codes(normalize_phones(restaurants['phone']),
+                                                  normalize_phones(places['phone']))
+    restaurant_phone, place_phone = restaurant_phone[left], place_phone[right]
+    has_phone = (restaurant_phone >= 0) & (place_phone >= 0)
+    phone_match = has_phone & (restaurant_phone == place_phone)
+
+    # The address counts when both sides have a street: same building number and similar street name
+    restaurant_building, place_building = _shared_codes(
+        *(normalize.normalize_building(side['building']).to_numpy(dtype=object, na_value=None)
+          for side in (restaurants, places)))
+    same_building = (restaurant_building[left] >= 0) & (restaurant_building[left] == place_building[right])
+    street_similarity = jaccard(streets[:len(restaurants)][left], streets[len(restaurants):][right])
+    has_address = restaurants['street'].notna().to_numpy()[left] & places['street'].notna().to_numpy()[right]
+    address = 0.5 * same_building + 0.5 * street_similarity
+
+    # Distance counts when both sides have coordinates (0 stands for missing in the source data)
+    rx, ry = geo_index.project(restaurants['latitude'].replace(0, np.nan), restaurants['longitude'])
+    px, py = geo_index.project(places['latitude'].replace(0, np.nan), places['longitude'])
+    distance = np.hypot(rx[left] - px[right], ry[left] - py[right])
+    has_distance = ~np.isnan(distance)
+    closeness = np.where(has_distance, 0.5 ** (np.nan_to_num(distance) / DISTANCE_HALF_METRES), 0.0)
+
+    evidence = np.column_stack([name_similarity, phone_match, address, closeness])
+    present = np.column_stack([np.ones(len(left), dtype=bool), has_phone, has_address, has_distance])
+    weights = np.array([WEIGHTS['name'], WEIGHTS['phone'], WEIGHTS['address'], WEIGHTS['distance']]) * present
+    return pd.DataFrame({
+        'restaurant': left,
+        'place': right,
+        'confidence': (evidence * weights).sum(axis=1) / weights.sum(axis=1),
+        'name_similarity': name_similarity,
+        'phone_match': np.where(has_phone, phone_match, np.nan),
+        'distance_m': distance,
+    })
+
+# Function to match places to restaurants, returning one row per matched restaurant with its place_id and the
+# evidence behind the match. A pair is kept when it is the restaurant's best place and no other restaurant
+# matches that place better.
+def match_places(restaurants, places, block='zipcode', min_confidence=MIN_CONFIDENCE):
+    restaurants, places = restaurants.reset_index(drop=True), places.reset_index(drop=True)
+    scored = score_pairs(restaurants, places, *candidate_pairs(restaurants, places, block))
+    scored = scored[scored['confidence'] >= min_confidence].sort_values('confidence', ascending=False, kind='stable')
+    matched = scored.drop_duplicates('place').drop_duplicates('restaurant').sort_values('restaurant')
+    return pd.concat([
+        pd.DataFrame({'camis': restaurants['camis'].to_numpy()[matched['restaurant'].to_numpy()],
+                      'place_id': places['place_id'].to_numpy()[matched['place'].to_numpy()]}),
+        matched.drop(columns=['restaurant', 'place']).reset_index(drop=True),
+    ], axis=1)
+
+# Function to return the columns of every restaurant's latest row in a camis index that matching compares.
+def restaurants_from_index(index):
+    latest = index.rows.iloc[index.restaurants['row_stop'].to_numpy() - 1]
+    return latest[['camis', 'dba', 'building', 'street', 'zipcode', 'phone', 'latitude', 'longitude']].reset_index(drop=True)
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Match places from a maps export to inspected restaurants.')
+    parser.add_argument('places', help='CSV of places with columns ' + ', '.join(PLACE_COLUMNS))
+    parser.add_argument('output', help='CSV to write the camis to place_id mapping to')
+    parser.add_argument('--block', choices=['zipcode', 'geohash'], default='zipcode')
+    parser.add_argument('--min-confidence', type=float, default=MIN_CONFIDENCE)
+    args = parser.parse_args()
+    places = pd.read_csv(args.places, dtype={'place_id': 'string', 'building': 'string', 'phone': 'string'})
+    matches = match_places(restaurants_from_index(camis_index.refresh_index()), places, args.block, args.min_confidence)
+    matches.to_csv(args.output, index=False)
+    print(f'{len(matches):,} of {len(places):,} places matched.')
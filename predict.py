@@ -0,0 +1,205 @@
+# Import necessary libraries
+import argparse
+
+import numpy as np
+import pandas as pd
+
+import camis_index
+import prepare
+import snapshot
+
+# ----------------------------------------------------------------------------------------------------------
+# Inspection Outcome Prediction
+# This script predicts whether a restaurant's next inspection will score 14 or more points (anything above
+# an A grade). Features are extracted per camis from the restaurant index in one vectorized pass over its
+# visit table: prior scores, critical counts, days since the last inspection, the restaurant's history of
+# the most common violation codes, and its cuisine, borough and neighbourhood (NTA).
+#
+# The model is a logistic regression fitted with Newton's method in numpy. Training pairs the history up to
+# each visit with the outcome of the restaurant's next visit; scoring uses the history up to the latest
+# visit, for every restaurant in one matrix product. Scores are cached, so looking up one restaurant is a
+# hash lookup.
+# __________________________________________________________________________________________________________
+
+# Scores from this value up are worse than an A grade
+FAIL_SCORE = 14
+
+# Number of violation codes, cuisines and neighbourhoods given their own feature (the rest share one)
+TOP_CODES = 20
+TOP_CUISINES = 20
+TOP_NTAS = 50
+
+# Boroughs given their own feature
+BOROS = ['Manhattan', 'Brooklyn', 'Queens', 'Bronx', 'Staten Island']
+
+# L2 penalty and Newton iterations of the logistic regression
+L2_PENALTY = 1.0
+NEWTON_STEPS = 8
+
+# Function to sum per-visit values cumulatively within each restaurant (visits are sorted by camis and date).
+def _cumulative(values, restaurant_of_visit, visit_start):
+    totals = np.cumsum(values, axis=0)
+    before = np.concatenate([np.zeros((1,) + totals.shape[1:]), totals])[visit_start]
+    return totals - before[restaurant_of_visit]
+
+# Function to one-hot encode values against a list of known values, with a last column for everything else.
+def _one_hot(values, known):
+    positions = pd.Index(known).get_indexer(values)
+    positions[positions < 0] = len(known)
+    encoded = np.zeros((len(values), len(known) + 1))
+    encoded[np.arange(len(values)), positions] = 1.0
+    return encoded
+
+# Class extracting per-restaurant features from a camis index. The vocabularies (top codes, cuisines and
+# neighbourhoods) are taken from the index it is fitted on, so scoring uses the same columns as training.
+class Features:
+    def __init__(self, index):
+        rows = index.rows
+        self.codes = rows['violation_code'].value_counts().index[:TOP_CODES].tolist()
+        self.cuisines = rows['cuisine_description'].value_counts().index[:TOP_CUISINES].tolist()
+        self.ntas = rows['nta'].value_counts().index[:TOP_NTAS].tolist()
+        self.city_mean = float(index.visits['score'].astype('float64').mean()) if len(index.visits) else 0.0
+        self.names = (['last_score', 'mean_score', 'log_inspections', 'last_critical', 'critical_rate',
+                       'log_days_since', 'last_violations']
+                      + [f'code_{code}' for code in self.codes]
+                      + [f'boro_{boro}' for boro in BOROS + ['other']]
+                      + [f'cuisine_{cuisine}' for cuisine in self.cuisines + ['other']]
+                      + [f'nta_{nta}' for nta in self.ntas + ['other']])
+
+    # Function to compute the running history of every visit: the restaurant's state right after that visit.
+    def history(self, index):
+        visits, restaurants = index.visits, index.restaurants
+        visit_start = restaurants['visit_start'].to_numpy()
+        restaurant_of_visit = np.repeat(np.arange(len(restaurants)), restaurants['inspections'].to_numpy())
+
+        # Violation code counts per visit, for the most common codes
+        visit_rows = (visits['row_stop'] - visits['row_start']).to_numpy()
+        row_visit = np.repeat(np.arange(len(visits)), visit_rows)
+        code = pd.Index(self.codes).get_indexer(index.rows['violation_code'])
+        counted = code >= 0
+        code_counts = np.bincount(row_visit[counted] * len(self.codes) + code[counted],
+                                  minlength=len(visits) * len(self.codes)).reshape(len(visits), len(self.codes))
+
+        score = visits['score'].to_numpy(dtype='float64', na_value=np.nan)
+        scored = ~np.isnan(score)
+        critical = visits['critical'].to_numpy(dtype='float64')
+        cumulative = _cumulative(np.column_stack([np.ones(len(visits)), scored, np.nan_to_num(score), critical,
+                                                  visits['violations'].to_numpy(), code_counts]),
+                                 restaurant_of_visit, visit_start)
+
+        # Mean score so far, falling back to the citywide mean before a restaurant's first scored visit
+        mean_score = np.divide(cumulative[:, 2], cumulative[:, 1], out=np.full(len(visits), self.city_mean),
+                               where=cumulative[:, 1] > 0)
+        violations = np.maximum(cumulative[:, 4], 1)
+        return {
+            'restaurant': restaurant_of_visit,
+            'date': visits['inspection_date'].to_numpy(),
+            'score': score,
+            'state': np.column_stack([
+                np.where(scored, score, mean_score),
+                mean_score,
+                np.log1p(cumulative[:, 0]),
+                critical,
+                cumulative[:, 3] / cumulative[:, 0],
+                np.zeros(len(visits)),
+                visits['violations'].to_numpy(dtype='float64'),
+                cumulative[:, 5:] / violations[:, None],
+            ]),
+        }
+
+    # Function to compute the static features of every restaurant (from its latest row).
+    def static(self, index):
+        latest = index.rows.iloc[index.restaurants['row_stop'].to_numpy() - 1]
+        return np.column_stack([
+            _one_hot(latest['boro'].astype(object).to_numpy(), BOROS),
+            _one_hot(latest['cuisine_description'].astype(object).to_numpy(), self.cuisines),
+            _one_hot(latest['nta'].astype(object).to_numpy(), self.ntas),
+        ])
+
+    # Function to build the training set: the state after each visit, with the gap to the restaurant's next
+    # visit as days since the last inspection, labelled by whether that next visit failed.
+    def training_set(self, index):
+        history = self.history(index)
+        static = self.static(index)
+        following = np.flatnonzero(history['restaurant'][1:] == history['restaurant'][:-1])
+        following = following[~np.isnan(history['score'][following + 1])]
+
+        X = history['state'][following]
+        gap = (history['date'][following + 1] - history['date'][following]) / np.timedelta64(1, 'D')
+        X[:, self.names.index('log_days_since')] = np.log1p(np.maximum(gap, 0))
+        X = np.column_stack([X, static[history['restaurant'][following]]])
+        y = (history['score'][following + 1] >= FAIL_SCORE).astype('float64')
+        return X, y
+
+    # Function to build the scoring set: every restaurant's state after its latest visit, as of `as_of`.
+    def scoring_set(self, index, as_of):
+        history = self.history(index)
+        last = index.restaurants['visit_stop'].to_numpy() - 1
+        X = history['state'][last]
+        gap = (np.datetime64(as_of) - history['date'][last]) / np.timedelta64(1, 'D')
+        X[:, self.names.index('log_days_since')] = np.log1p(np.maximum(gap, 0))
+        return np.column_stack([X, self.static(index)])
+
+# Class of L2-regularized logistic regression on standardized features, fitted by Newton's method.
+class LogisticModel:
+    def fit(self, X, y):
+        self.mean = X.mean(axis=0)
+        self.std = X.std(axis=0)
+        self.std[self.std == 0] = 1.0
+        Z = np.column_stack([np.ones(len(X)), (X - self.mean) / self.std])
+
+        penalty = np.full(Z.shape[1], L2_PENALTY)
+        penalty[0] = 0.0
+        self.weights = np.zeros(Z.shape[1])
+        for _ in range(NEWTON_STEPS):
+            p = 1.0 / (1.0 + np.exp(-Z @ self.weights))
+            gradient = Z.T @ (p - y) + penalty * self.weights
+            hessian = (Z * (p * (1 - p))[:, None]).T @ Z + np.diag(penalty)
+            self.weights -= np.linalg.solve(hessian, gradient)
+        return self
+
+    # Function to return the probability of a failed inspection for every row of X, in one batched call.
+    def predict_proba(self, X):
+        return 1.0 / (1.0 + np.exp(-(self.weights[0] + ((X - self.mean) / self.std) @ self.weights[1:])))
+
+# Class training the model on a restaurant index and scoring restaurants, in bulk or one at a time.
+class OutcomePredictor:
+    def __init__(self, index):
+        self.index = index
+        self.features = Features(index)
+        self.model = LogisticModel().fit(*self.features.training_set(index))
+        self.scores = None
+
+    # Function to score every restaurant as of a date (the latest inspection by default) and cache the result.
+    def score_all(self, as_of=None):
+        as_of = self.index.visits['inspection_date'].max() if as_of is None else pd.Timestamp(as_of)
+        probability = self.model.predict_proba(self.features.scoring_set(self.index, as_of))
+        self.scores = pd.DataFrame({
+            'camis': self.index.restaurants['camis'].to_numpy(),
+            'last_inspection': self.index.restaurants['last_inspection'].to_numpy(),
+            'last_score': self.index.restaurants['last_score'].to_numpy(),
+            'fail_probability': probability,
+        })
+        self._cached = probability
+        self._positions = pd.Index(self.scores['camis'])
+        return self.scores
+
+    # Function to return one restaurant's cached fail probability, scoring everyone first if needed.
+    def score(self, camis):
+        if self.scores is None:
+            self.score_all()
+        return float(self._cached[self._positions.get_loc(camis)])
+
+# Function to train a predictor on the prepared inspections of a year range of the snapshot store.
+def train_predictor(start_year, end_year, root=snapshot.DATASET_ROOT):
+    prepared = prepare.prepare_inspections(snapshot.read_partitions(start_year, end_year, root))
+    return OutcomePredictor(camis_index.CamisIndex.build(prepared))
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Score every restaurant by its chance of failing its next inspection.')
+    parser.add_argument('start_year', type=int)
+    parser.add_argument('end_year', type=int)
+    parser.add_argument('--top', type=int, default=20, help='number of highest-risk restaurants to print')
+    args = parser.parse_args()
+    scores = train_predictor(args.start_year, args.end_year).score_all()
+    print(scores.sort_values('fail_probability', ascending=False).head(args.top).to_string(index=False))
@@ -0,0 +1,195 @@
+# Import necessary libraries
+import numpy as np
+import pandas as pd
+
+import snapshot
+
+# ----------------------------------------------------------------------------------------------------------
+# NYC Health Inspection Preparation
+# This script runs the cleaning steps walked through in the app's Prepare section. Every step is a
+# vectorized pandas operation: no groupby().apply(lambda), no per-column Python loops and no per-row work.
+# __________________________________________________________________________________________________________
+
+# Inspection types that do not pertain to food safety
+REMOVE_TYPES = ('Calorie Posting', 'Pre-permit', 'Smoke-Free Air Act', 'Trans Fat', 'Administrative')
+
+# Values used to fill violation columns when an inspection recorded no violations
+NO_VIOLATION = ['none', 'No violations were recorded']
+
+# Columns and rows the preparation steps keep. Passed to acquire.get_health_inspection_data() as `columns` and
+# `filters`, they are pushed down to the API so the grade columns and the removed inspection types are never
+# downloaded.
+SOURCE_COLUMNS = list(snapshot.PREPARED_SCHEMA)
+SOURCE_FILTERS = [('inspection_type', 'not starts with', REMOVE_TYPES)]
+
+# Function to test whether values start with any of the given prefixes.
+# For categorical columns the test runs once per category instead of once per row.
+def starts_with(series, prefixes):
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        matches = np.asarray(series.cat.categories.str.startswith(prefixes), dtype=bool)
+        return pd.Series((codes >= 0) & matches[codes], index=series.index)
+    return series.str.startswith(prefixes).fillna(False).astype(bool)
+
+# Function to replace values where `condition` holds, adding the value as a category first if needed.
+def fill_where(series, condition, value):
+    if isinstance(series.dtype, pd.CategoricalDtype) and value not in series.cat.categories:
+        series = series.cat.add_categories([value])
+    return series.mask(condition, value)
+
+# Class grouping rows into inspection visits (camis + inspection_date) once, with a sort and ngroup. Every row
+# gets the id of its visit, and per-visit flags come from bincounts over those ids. Frames derived from the
+# grouped one by dropping or filling rows keep its index, so their flags reuse the same ids instead of
+# grouping again.
+class Visits:
+    def __init__(self, df):
+        ids = df.groupby(['camis', 'inspection_date'], sort=True, observed=True, dropna=False).ngroup()
+        self.ids = ids.to_numpy()
+        self.index = df.index
+        self.n_visits = int(self.ids.max()) + 1 if len(ids) else 0
+
+        # The first row of each visit holds its keys
+        first = np.zeros(self.n_visits, dtype=np.int64)
+        first[self.ids[::-1]] = np.arange(len(ids))[::-1]
+        self.keys = df[['camis', 'inspection_date']].iloc[first].reset_index(drop=True)
+
+    # Function to return the visit id of every row of `df`, which must keep the grouped frame's index.
+    def ids_of(self, df):
+        if df.index is self.index:
+            return self.ids
+        if isinstance(self.index, pd.RangeIndex) and self.index.start == 0 and self.index.step == 1:
+            return self.ids[df.index.to_numpy()]
+        return pd.Series(self.ids, index=self.index).reindex(df.index).to_numpy()
+
+    # Function to count, per visit id, the rows of `df` (or the rows where `mask` holds).
+    def count(self, df, mask=None):
+        ids = self.ids_of(df)
+        if mask is None:
+            return np.bincount(ids, minlength=self.n_visits)
+        return np.bincount(ids[np.asarray(mask, dtype=bool)], minlength=self.n_visits)
+
+    # Function to compute the per-visit table of `df`: row count, null violation codes, whether the visit mixes
+    # null and non-null codes or Administrative and Cycle inspections, its maximum score and number of
+    # critical violations. Visits with no rows left in `df` are left out.
+    def table(self, df):
+        rows = self.count(df)
+        nulls = self.count(df, df['violation_code'].isna())
+        administrative = self.count(df, starts_with(df['inspection_type'], 'Administrative'))
+        cycle = self.count(df, starts_with(df['inspection_type'], 'Cycle'))
+        max_score = np.full(self.n_visits, np.nan)
+        np.fmax.at(max_score, self.ids_of(df), df['score'].to_numpy(dtype='float64', na_value=np.nan))
+
+        table = self.keys.assign(
+            rows=rows,
+            null_violations=nulls,
+            has_null_violation=nulls > 0,
+            mixed_violations=(nulls > 0) & (nulls < rows),
+            mixed_types=(administrative > 0) & (cycle > 0),
+            max_score=max_score,
+            critical_count=self.count(df, df['critical_flag'] == 'Critical'),
+        )
+        return table[rows > 0]
+
+    # Function to broadcast per-visit values (indexed by visit id) back to the rows of `df`.
+    def per_row(self, df, values):
+        return pd.Series(np.asarray(values)[self.ids_of(df)], index=df.index)
+
+# Function to find visits (camis + inspection_date) with a null violation_code and at least `min_rows` rows.
+# `visits` can be a Visits grouping of a frame `df` was derived from, to skip grouping again.
+def visits_with_null_violations(df, min_rows=2, visits=None):
+    visits = Visits(df) if visits is None else visits
+    keep = (visits.count(df, df['violation_code'].isna()) > 0) & (visits.count(df) >= min_rows)
+    return df[keep[visits.ids_of(df)]].reset_index(drop=True)
+
+# Function to count nulls in `column` for each value of `by`.
+def null_counts_by(df, by, column):
+    return df[column].isna().groupby(df[by], observed=True).sum()
+
+# Function to count nulls in every column, keeping only the columns that have any.
+def null_counts(df):
+    counts = df.isna().sum()
+    return counts[counts > 0]
+
+# Function to drop the grade columns: grades only exist for some Cycle inspections.
+def drop_grades(df):
+    return df.drop(columns=['grade', 'grade_date'], errors='ignore')
+
+# Function to drop rows missing zoning data (bin, then council_district).
+def drop_missing_zoning(df):
+    return df.dropna(subset=['bin', 'council_district'])
+
+# Function to drop inspection types unrelated to food safety (Calorie Posting, Pre-permit, ...).
+def drop_irrelevant_types(df):
+    return df[~starts_with(df['inspection_type'], REMOVE_TYPES[:-1])]
+
+# Function to drop Administrative inspections, which cover signage and paperwork rather than food safety.
+def drop_administrative(df):
+    return df[~starts_with(df['inspection_type'], 'Administrative')]
+
+# Function to fill null violations on inspections that recorded none, or on re-openings flagged
+# Not Applicable, with 'none'.
+def fill_no_violations(df):
+    missing_code = df['violation_code'].isna()
+    no_violations = missing_code & starts_with(df['action'], 'No violations were recorded at the time of this inspection.')
+    reopened = (missing_code & starts_with(df['action'], 'Establishment re-opened')
+                & (df['critical_flag'] == 'Not Applicable'))
+    fill = no_violations | reopened
+
+    df = df.copy()
+    df['violation_code'] = fill_where(df['violation_code'], fill, NO_VIOLATION[0])
+    df['violation_description'] = fill_where(df['violation_description'], fill, NO_VIOLATION[1])
+    return df
+
+# Function to drop remaining null violations on cited inspections, which cannot be inferred.
+def drop_uninferable_violations(df):
+    cited = df['violation_code'].isna() & starts_with(df['action'], 'Violations were cited in the following area(s)')
+    return df[~cited]
+
+# Function to standardize formats and dtypes of the cleaned rows.
+def standardize(df):
+    df = df.copy()
+
+    # Phone numbers keep only digits, with missing or all-zero values replaced by a placeholder
+    phone = df['phone'].astype('string').fillna('').str.replace(r'\D', '', regex=True)
+    df['phone'] = phone.mask(phone.isin(['', '0000000000']), '1000000000')
+
+    # Inspection dates are standardized to the date alone (no time part)
+    df['inspection_date'] = pd.to_datetime(df['inspection_date']).dt.normalize()
+
+    # Whole-number float columns become compact nullable integers, and text columns categoricals, in one
+    # pass over the frame, instead of the integer-to-string round trip shown in the Prepare section
+    return snapshot.coerce_to_schema(df, snapshot.PREPARED_SCHEMA)
+
+# Preparation steps in the order the Prepare section walks through them
+PREPARE_STEPS = [
+    drop_grades,
+    drop_missing_zoning,
+    drop_irrelevant_types,
+    drop_administrative,
+    fill_no_violations,
+    drop_uninferable_violations,
+    standardize,
+]
+
+# Function to run the preparation steps on the acquired inspections frame, yielding the frame after each
+# step (useful for showing intermediate states).
+def iter_steps(df):
+    for step in PREPARE_STEPS:
+        df = step(df)
+        yield step.__name__, df
+
+# Function to run the full preparation pipeline on the acquired inspections frame.
+def prepare_inspections(df):
+    for step in PREPARE_STEPS:
+        df = step(df)
+    return df
+
+# Function to run the preparation pipeline over a stream of chunks. Every step above works row by row,
+# so preparing chunk by chunk gives the same rows as preparing the whole frame at once.
+def prepare_chunks(chunks):
+    for chunk in chunks:
+        yield prepare_inspections(chunk)
+
+# Function to stream prepared chunks for a year range of the snapshot store in fixed memory.
+def iter_prepared(start_year, end_year, root=snapshot.DATASET_ROOT, batch_size=100_000):
+    return prepare_chunks(snapshot.iter_partitions(start_year, end_year, root, batch_size=batch_size))
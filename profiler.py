@@ -0,0 +1,130 @@
+# Import necessary libraries
+import argparse
+import os
+
+import numpy as np
+import pandas as pd
+
+import prepare
+import snapshot
+
+# ----------------------------------------------------------------------------------------------------------
+# Dataset Profiler
+# This script computes the null, zero, blank and dtype tables shown in the app's Prepare section. Each
+# column of each chunk is scanned once for all metrics, and chunks are streamed from the snapshot store,
+# so the full raw dataset is never held in memory. The tables it writes replace the hand-made CSVs.
+# __________________________________________________________________________________________________________
+
+# Metrics collected for every column
+METRICS = ['Null Count', 'Zero Count', 'Zero Count (str)', 'Blank Count', 'Space Count']
+
+# Text values counted by the profiler, in the order of their metric columns
+_TEXT_VALUES = ['0', '', ' ']
+
+# Function to compute every metric for one column of one chunk.
+def _profile_column(series):
+    # Numeric columns: nulls and numeric zeros, both read straight off the NumPy array
+    if pd.api.types.is_numeric_dtype(series.dtype) and not pd.api.types.is_bool_dtype(series.dtype):
+        values = series.to_numpy(dtype='float64', na_value=np.nan)
+        return [int(np.isnan(values).sum()), int(np.count_nonzero(values == 0)), 0, 0, 0]
+
+    if pd.api.types.is_datetime64_any_dtype(series.dtype):
+        return [int(series.isna().sum()), 0, 0, 0, 0]
+
+    # Text columns: one hashing pass gives the code of every distinct value, and the counts of nulls
+    # and of '0', '' and ' ' are then read from a bincount over those codes
+    codes, uniques = pd.factorize(series.to_numpy(), use_na_sentinel=True)
+    counts = np.bincount(codes + 1, minlength=len(uniques) + 1)
+    positions = pd.Index(uniques).get_indexer(_TEXT_VALUES)
+    return [int(counts[0]), 0] + [int(counts[p + 1]) if p >= 0 else 0 for p in positions]
+
+# Function to combine the dtypes a column had across chunks into one dtype name.
+def _combine_dtypes(dtypes):
+    unique = set(dtypes)
+    if len(unique) == 1:
+        return dtypes[0]
+
+    # An integer column that has nulls in some chunks is read back as float
+    if unique <= {'int64', 'float64'}:
+        return 'float64'
+    return 'object'
+
+# Function to profile a stream of DataFrame chunks, returning one row of metrics per column.
+def profile_chunks(chunks):
+    totals = {}
+    dtypes = {}
+    rows = 0
+
+    for chunk in chunks:
+        rows += len(chunk)
+        for column in chunk.columns:
+            metrics = _profile_column(chunk[column])
+            if column in totals:
+                totals[column] = [a + b for a, b in zip(totals[column], metrics)]
+            else:
+                totals[column] = metrics
+            dtypes.setdefault(column, []).append(str(chunk[column].dtype))
+
+    profile = pd.DataFrame.from_dict(totals, orient='index', columns=METRICS)
+    profile['Data Types'] = [_combine_dtypes(dtypes[column]) for column in profile.index]
+    profile.index.name = 'Column'
+    profile.attrs['rows'] = rows
+    return profile
+
+# Function to profile a CSV file in chunks.
+def profile_csv(path, chunksize=100_000):
+    return profile_chunks(pd.read_csv(path, chunksize=chunksize))
+
+# Function to profile a year range of the snapshot store, optionally after running the prepare steps on
+# each chunk (every prepare step works row by row, so chunked results match a whole-frame run).
+def profile_dataset(start_year, end_year, root=snapshot.DATASET_ROOT, prepared=False, batch_size=100_000):
+    chunks = snapshot.iter_partitions(start_year, end_year, root, batch_size=batch_size)
+    if prepared:
+        chunks = prepare.prepare_chunks(chunks)
+    return profile_chunks(chunks)
+
+# Function to build the "Dataset Overview" table (inspections_df_status.csv).
+def status_table(profile):
+    return profile[['Null Count', 'Zero Count', 'Zero Count (str)', 'Data Types']].reset_index()
+
+# Function to build the table of columns with nulls (inspections_df_isna.csv).
+def null_table(profile):
+    return profile.loc[profile['Null Count'] > 0, ['Null Count']].reset_index()
+
+# Function to build the table of columns with nulls or zeros (inspections_prepare.csv).
+def prepare_table(profile):
+    status = status_table(profile)
+    return status[(status[['Null Count', 'Zero Count', 'Zero Count (str)']] > 0).any(axis=1)].reset_index(drop=True)
+
+# Function to build the null and zero table of the prepared data (null_zero_counts.csv).
+def null_zero_table(profile):
+    table = profile.rename(columns={
+        'Zero Count': 'Numeric_Zero_Count',
+        'Zero Count (str)': 'String_Zero_Count',
+        'Null Count': 'Null_Count',
+    })
+    table.index.name = None
+    return table[['Numeric_Zero_Count', 'String_Zero_Count', 'Null_Count', 'Blank Count', 'Space Count', 'Data Types']]
+
+# Function to regenerate the app's profile CSVs from the snapshot store.
+def write_tables(start_year, end_year, out_dir='.', root=snapshot.DATASET_ROOT):
+    raw = profile_dataset(start_year, end_year, root)
+    prepared = profile_dataset(start_year, end_year, root, prepared=True)
+
+    tables = {
+        'inspections_df_status.csv': (status_table(raw), False),
+        'inspections_df_isna.csv': (null_table(raw), False),
+        'inspections_prepare.csv': (prepare_table(raw), False),
+        'null_zero_counts.csv': (null_zero_table(prepared), True),
+    }
+    for file_name, (table, index) in tables.items():
+        table.to_csv(os.path.join(out_dir, file_name), index=index)
+    return tables
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Regenerate the Prepare section profile tables from the snapshot store.')
+    parser.add_argument('start_year', type=int)
+    parser.add_argument('end_year', type=int)
+    parser.add_argument('--out-dir', default='.')
+    args = parser.parse_args()
+    write_tables(args.start_year, args.end_year, args.out_dir)
@@ -0,0 +1,178 @@
+# Import necessary libraries
+import argparse
+import hashlib
+import inspect
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+import camis_index
+import snapshot
+
+# ----------------------------------------------------------------------------------------------------------
+# Review Sentiment
+# This script reads restaurant reviews from local files (JSON lines or CSV exports with at least `camis`
+# and `text` columns, and optionally `rating` and `time`), scores their sentiment with a small built-in
+# lexicon and rolls the scores up per restaurant, ready to join with the inspections data. Nothing is
+# fetched over the network.
+#
+# Scoring is batched: the reviews of a batch are tokenized together, every token is looked up in the
+# lexicon in one vectorized step, and token scores are summed per review. A token is flipped when one of
+# the three tokens before it is a negation ("not clean") and strengthened after an intensifier ("very
+# dirty"). Scores are cached by a hash of each review's restaurant and text, so re-runs only score reviews
+# that were not seen before. Each cached score records the version of the scorer (a hash of its code and word
+# lists) it came from, and scores from another version are scored again.
+# __________________________________________________________________________________________________________
+
+# Default location of the review score cache
+CACHE_PATH = os.path.join(snapshot.DATASET_ROOT, '_review_sentiment.parquet')
+
+# Number of reviews tokenized and scored together
+BATCH_SIZE = 50_000
+
+# Word valences, on a -4 (most negative) to +4 (most positive) scale
+LEXICON = {
+    'amazing': 3.1, 'awesome': 3.1, 'excellent': 3.2, 'fantastic': 3.0, 'great': 3.1, 'good': 1.9, 'nice': 1.8,
+    'delicious': 3.0, 'tasty': 2.3, 'fresh': 1.6, 'friendly': 2.2, 'clean': 1.9, 'spotless': 2.5, 'love': 3.2,
+    'loved': 2.9, 'best': 3.2, 'perfect': 2.7, 'recommend': 1.5, 'helpful': 1.8, 'attentive': 1.7, 'cozy': 1.6,
+    'pleasant': 2.2, 'wonderful': 2.7, 'enjoyed': 2.3, 'yummy': 2.4, 'quick': 1.0, 'polite': 1.8, 'happy': 2.7,
+    'bad': -2.5, 'terrible': -2.9, 'awful': -2.8, 'horrible': -2.9, 'disgusting': -3.0, 'gross': -2.5,
+    'dirty': -2.0, 'filthy': -2.7, 'rude': -2.0, 'slow': -1.0, 'cold': -0.8, 'stale': -1.6, 'bland': -1.4,
+    'greasy': -1.2, 'overpriced': -1.5, 'sick': -2.1, 'poisoning': -3.0, 'roach': -2.6, 'roaches': -2.6,
+    'cockroach': -2.6, 'rat': -2.5, 'rats': -2.5, 'mice': -2.3, 'mouse': -2.0, 'flies': -1.8, 'hair': -1.2,
+    'smell': -1.0, 'smelly': -1.9, 'worst': -3.1, 'disappointing': -2.2, 'disappointed': -2.1,
+    'undercooked': -2.0, 'raw': -1.0, 'moldy': -2.6, 'unsanitary': -2.6, 'hate': -2.7, 'avoid': -1.8,
+}
+
+# Words that flip the sentiment of the next few words
+NEGATIONS = {'not', 'no', "don't", "didn't", "isn't", "wasn't", "aren't", "won't", 'never', 'nothing', 'hardly',
+             "doesn't", "can't", 'cannot', 'without'}
+
+# Words that strengthen the next word, and by how much
+BOOSTERS = {'very': 0.293, 'really': 0.293, 'extremely': 0.293, 'so': 0.293, 'super': 0.293, 'incredibly': 0.293,
+            'absolutely': 0.293, 'totally': 0.293, 'slightly': -0.293, 'somewhat': -0.293, 'kind': -0.293}
+
+# Number of tokens a negation reaches forward
+NEGATION_REACH = 3
+
+# Normalization constant mapping summed valences into (-1, 1)
+NORMALIZATION_ALPHA = 15
+
+# Function to read every review file (.jsonl, .json or .csv) in a directory into one frame.
+def read_reviews(directory):
+    frames = []
+    for name in sorted(os.listdir(directory)):
+        path = os.path.join(directory, name)
+        if name.endswith(('.jsonl', '.json')):
+            frames.append(pd.read_json(path, lines=name.endswith('.jsonl'), dtype={'camis': 'int64'}))
+        elif name.endswith('.csv'):
+            frames.append(pd.read_csv(path, dtype={'camis': 'int64', 'text': 'string'}))
+    if not frames:
+        return pd.DataFrame({'camis': pd.Series(dtype='int64'), 'text': pd.Series(dtype='string')})
+    reviews = pd.concat(frames, ignore_index=True)
+    reviews['text'] = reviews['text'].astype('string').fillna('')
+    return reviews
+
+# Function to hash every review by its restaurant and text, so the same review always gets the same key.
+def review_hashes(reviews):
+    return pd.util.hash_pandas_object(reviews[['camis', 'text']], index=False).to_numpy()
+
+# Function to score a batch of review texts, returning one compound score in (-1, 1) per text.
+def score_texts(texts):
+    texts = pd.Series(texts, dtype='string').reset_index(drop=True)
+    # Sentence ends become tokens of their own, so negations and intensifiers stop at them
+    tokens = (texts.str.lower().str.replace(r'[.!?;]+', ' . ', regex=True)
+              .str.replace(r"[^a-z'. ]+", ' ', regex=True).str.split().explode())
+    review = tokens.index.to_numpy()
+
+    # Words are looked up once per distinct word, then spread back to the tokens
+    words, vocabulary = pd.factorize(tokens.to_numpy(dtype=object, na_value=''))
+    valence = np.array([LEXICON.get(word, 0.0) for word in vocabulary] + [0.0])[words]
+    negation = np.array([word in NEGATIONS for word in vocabulary] + [False])[words]
+    boost = np.array([BOOSTERS.get(word, 0.0) for word in vocabulary] + [0.0])[words]
+    sentence_end = np.array([word == '.' for word in vocabulary] + [False])[words]
+
+    # Number every sentence of every review, so shifted tokens can be checked to be in the same one
+    sentence = np.ones(len(review), dtype=bool)
+    sentence[1:] = (review[1:] != review[:-1]) | sentence_end[1:]
+    sentence = np.cumsum(sentence)
+
+    # Flip tokens with a negation among the few tokens before them (in the same sentence), and strengthen
+    # tokens right after a booster in the direction of their sign
+    negated = np.zeros(len(review), dtype=bool)
+    for shift in range(1, NEGATION_REACH + 1):
+        negated[shift:] ^= negation[:-shift] & (sentence[shift:] == sentence[:-shift])
+    boosted = np.zeros(len(review))
+    boosted[1:] = np.where(sentence[1:] == sentence[:-1], boost[:-1], 0.0)
+    valence = (valence + np.sign(valence) * boosted) * np.where(negated, -0.74, 1.0)
+
+    total = np.bincount(review, weights=valence, minlength=len(texts))
+    return total / np.sqrt(total ** 2 + NORMALIZATION_ALPHA)
+
+# Function to compute the version of the scorer: a hash of the scoring code and every word list and constant it
+# reads, so changing any of them invalidates the cached scores.
+def scorer_version():
+    settings = json.dumps([LEXICON, sorted(NEGATIONS), BOOSTERS, NEGATION_REACH, NORMALIZATION_ALPHA], sort_keys=True)
+    return hashlib.sha256((inspect.getsource(score_texts) + settings).encode()).hexdigest()[:16]
+
+# Function to score reviews, reusing cached scores by review hash and scoring only new reviews, in batches.
+# Returns the reviews with `review_hash` and `sentiment` columns, and the number of reviews newly scored.
+def score_reviews(reviews, cache_path=CACHE_PATH, batch_size=BATCH_SIZE):
+    reviews = reviews.assign(review_hash=review_hashes(reviews))
+    cache = pd.read_parquet(cache_path) if os.path.isfile(cache_path) else pd.DataFrame(
+        {'review_hash': pd.Series(dtype='uint64'), 'sentiment': pd.Series(dtype='float64'),
+         'scorer': pd.Series(dtype='string')})
+
+    # Scores from another version of the scorer (or from a cache written before versions were recorded) are dropped
+    version = scorer_version()
+    current = np.zeros(len(cache), dtype=bool)
+    if 'scorer' in cache.columns:
+        current = (cache['scorer'] == version).to_numpy(dtype=bool)
+    stale = not current.all()
+    cache = cache[current].assign(scorer=version)
+
+    new = reviews.drop_duplicates('review_hash')
+    new = new[~new['review_hash'].isin(cache['review_hash'])]
+    scored = [pd.DataFrame({'review_hash': new['review_hash'].to_numpy()[start:start + batch_size],
+                            'sentiment': score_texts(new['text'].iloc[start:start + batch_size]),
+                            'scorer': version})
+              for start in range(0, len(new), batch_size)]
+    if scored or stale:
+        cache = pd.concat([cache] + scored, ignore_index=True)
+        os.makedirs(os.path.dirname(cache_path) or '.', exist_ok=True)
+        cache.to_parquet(cache_path, index=False)
+
+    return reviews.merge(cache.drop(columns='scorer'), on='review_hash', how='left'), len(new)
+
+# Function to aggregate review sentiment per restaurant.
+def sentiment_by_restaurant(scored):
+    aggregations = {
+        'reviews': ('sentiment', 'size'),
+        'mean_sentiment': ('sentiment', 'mean'),
+        'positive_share': ('positive', 'mean'),
+        'negative_share': ('negative', 'mean'),
+    }
+    if 'rating' in scored.columns:
+        aggregations['mean_rating'] = ('rating', 'mean')
+    scored = scored.assign(positive=scored['sentiment'] >= 0.05, negative=scored['sentiment'] <= -0.05)
+    return scored.groupby('camis', sort=True).agg(**aggregations).reset_index()
+
+# Function to join per-restaurant sentiment with the restaurants' inspection summaries from the camis index.
+# Restaurants without reviews keep null sentiment.
+def join_inspections(sentiment, index):
+    restaurants = index.restaurants[['camis', 'inspections', 'last_inspection', 'last_score', 'critical_count',
+                                     'last_action']]
+    return restaurants.merge(sentiment.astype({'camis': restaurants['camis'].dtype}), on='camis', how='left')
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Score review sentiment and join it with the inspections data.')
+    parser.add_argument('directory', help='directory of review files (.jsonl, .json or .csv)')
+    parser.add_argument('--cache', default=CACHE_PATH)
+    parser.add_argument('--top', type=int, default=10, help='number of most negatively reviewed restaurants to print')
+    args = parser.parse_args()
+    scored, new = score_reviews(read_reviews(args.directory), args.cache)
+    print(f'{len(scored):,} reviews, {new:,} newly scored.')
+    joined = join_inspections(sentiment_by_restaurant(scored), camis_index.refresh_index())
+    print(joined.dropna(subset=['reviews']).sort_values('mean_sentiment').head(args.top).to_string(index=False))
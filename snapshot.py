@@ -0,0 +1,234 @@
+# Import necessary libraries
+import os
+import json
+import shutil
+from urllib.parse import quote, unquote
+
+import pandas as pd
+import pyarrow.parquet as pq
+
+# ----------------------------------------------------------------------------------------------------------
+# Snapshot Store
+# This script defines the columnar (Parquet) snapshot format used to cache NYC health inspection data.
+# Every column has an explicit dtype, so identifiers come back as integers, dates as datetimes and
+# low-cardinality text as categoricals, and readers can load only the columns they need.
+#
+# Data is stored as one dataset partitioned by inspection year (and optionally borough):
+#   nyc_health_inspections/inspection_year=2021/boro=Bronx/<part>.parquet
+# A _manifest.json file at the dataset root lists the years that have been fully fetched.
+# __________________________________________________________________________________________________________
+
+# Default location of the partitioned dataset
+DATASET_ROOT = 'nyc_health_inspections'
+
+# Name of the partition column derived from inspection_date
+YEAR_COLUMN = 'inspection_year'
+
+# Explicit dtypes for the 26 columns of the inspections dataset. Identifiers use the narrowest nullable
+# integer type that holds their range, and low-cardinality text is stored as categoricals.
+SCHEMA = {
+    'camis': 'int32',
+    'dba': 'string',
+    'boro': 'category',
+    'building': 'string',
+    'street': 'string',
+    'zipcode': 'Int32',
+    'phone': 'string',
+    'cuisine_description': 'category',
+    'inspection_date': 'datetime64[ns]',
+    'action': 'category',
+    'critical_flag': 'category',
+    'score': 'Int16',
+    'record_date': 'datetime64[ns]',
+    'inspection_type': 'category',
+    'latitude': 'float64',
+    'longitude': 'float64',
+    'community_board': 'Int16',
+    'council_district': 'Int8',
+    'census_tract': 'Int32',
+    'bin': 'Int32',
+    'bbl': 'Int64',
+    'nta': 'category',
+    'violation_code': 'category',
+    'violation_description': 'string',
+    'grade': 'category',
+    'grade_date': 'datetime64[ns]',
+}
+
+# Dtypes of the prepared frame: the same compact types, without the dropped grade columns
+PREPARED_SCHEMA = {column: dtype for column, dtype in SCHEMA.items() if column not in ('grade', 'grade_date')}
+
+# Function to convert a raw frame (from the API or a legacy CSV) to the snapshot schema.
+def coerce_to_schema(df, schema=SCHEMA):
+    df = df.copy()
+    for column, dtype in schema.items():
+        if column not in df.columns or str(df[column].dtype) == dtype:
+            continue
+
+        if dtype.startswith('datetime'):
+            if not pd.api.types.is_datetime64_any_dtype(df[column].dtype):
+                df[column] = pd.to_datetime(df[column], errors='coerce')
+        elif dtype in ('category', 'string'):
+            df[column] = df[column].astype(dtype)
+        else:
+            # Values arrive as strings from the API and as floats from CSV, so go through numeric first
+            values = pd.to_numeric(df[column], errors='coerce')
+            df[column] = values.round().astype(dtype) if dtype != 'float64' else values
+    return df
+
+# Function to compare the memory footprint of two versions of a frame, column by column.
+def memory_report(before, after):
+    report = pd.DataFrame({
+        'Before (bytes)': before.memory_usage(deep=True, index=False),
+        'After (bytes)': after.memory_usage(deep=True, index=False),
+        'Before dtype': before.dtypes.astype(str),
+        'After dtype': after.dtypes.astype(str),
+    })
+    report['Reduction'] = 1 - report['After (bytes)'] / report['Before (bytes)']
+    report.loc['Total'] = [report['Before (bytes)'].sum(), report['After (bytes)'].sum(), '', '',
+                           1 - report['After (bytes)'].sum() / report['Before (bytes)'].sum()]
+    return report
+
+# Function to write a frame to a Parquet snapshot, coercing it to the schema first.
+def write_snapshot(df, path):
+    coerce_to_schema(df).to_parquet(path, index=False)
+
+# Function to read a Parquet snapshot, loading only the requested columns if a list is given.
+def read_snapshot(path, columns=None):
+    if not os.path.exists(path):
+        return None
+    return pd.read_parquet(path, columns=columns)
+
+# Function to export a frame read from the store to CSV for sharing or inspection in other tools.
+def export_csv(df, csv_path):
+    # Dates are written in the same format the API uses
+    df.to_csv(csv_path, index=False, date_format='%Y-%m-%dT%H:%M:%S.000')
+    return csv_path
+
+# Function to read the dataset manifest, which maps each stored year to its row count and high-water marks.
+def load_manifest(root=DATASET_ROOT):
+    path = os.path.join(root, '_manifest.json')
+    if not os.path.isfile(path):
+        return {'years': {}}
+    with open(path) as f:
+        return json.load(f)
+
+# Function to write the dataset manifest.
+def save_manifest(manifest, root=DATASET_ROOT):
+    os.makedirs(root, exist_ok=True)
+    with open(os.path.join(root, '_manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+
+# Function to list the years that are already stored in the dataset.
+def stored_years(root=DATASET_ROOT):
+    return sorted(int(year) for year in load_manifest(root)['years'])
+
+# Function to drop years from the manifest, so they no longer count as stored.
+def forget_years(years, root=DATASET_ROOT):
+    manifest = load_manifest(root)
+    if any(str(year) in manifest['years'] for year in years):
+        for year in years:
+            manifest['years'].pop(str(year), None)
+        save_manifest(manifest, root)
+
+# Function to remove the stored files for one inspection year.
+def clear_year_partition(year, root=DATASET_ROOT):
+    partition_dir = os.path.join(root, f'{YEAR_COLUMN}={year}')
+    if os.path.isdir(partition_dir):
+        shutil.rmtree(partition_dir)
+
+# Function to record a stored year in the manifest with its row count and high-water marks. `pushdown` holds the
+# $select and $where the year was fetched with, if any, so readers know which columns and rows it holds.
+def record_year(year, rows, record_date, inspection_date, root=DATASET_ROOT, by_boro=False, pushdown=None):
+    manifest = load_manifest(root)
+    pushdown = pushdown or {}
+    manifest['years'][str(year)] = {
+        'rows': int(rows),
+        'by_boro': by_boro,
+        'select': pushdown.get('select'),
+        'where': pushdown.get('where'),
+        'record_date': record_date.strftime('%Y-%m-%dT%H:%M:%S.000') if pd.notna(record_date) else None,
+        'inspection_date': inspection_date.strftime('%Y-%m-%dT%H:%M:%S.000') if pd.notna(inspection_date) else None,
+    }
+    save_manifest(manifest, root)
+
+# Function to replace the partition for one inspection year (an empty frame records a year with no rows).
+def write_year_partition(df, year, root=DATASET_ROOT, by_boro=False, pushdown=None):
+    clear_year_partition(year, root)
+
+    df = coerce_to_schema(df)
+    if not df.empty:
+        df[YEAR_COLUMN] = year
+        partition_cols = [YEAR_COLUMN, 'boro'] if by_boro else [YEAR_COLUMN]
+        df.to_parquet(root, index=False, partition_cols=partition_cols)
+
+    record_year(year, len(df), df['record_date'].max(), df['inspection_date'].max(), root, by_boro, pushdown)
+
+# Function to write one batch of a year's rows as an extra part file, leaving the year's other parts alone.
+# Used by streaming ingestion; the year is only recorded in the manifest once all its batches are written.
+def append_year_batch(df, year, part, root=DATASET_ROOT, by_boro=False):
+    year_dir = os.path.join(root, f'{YEAR_COLUMN}={year}')
+    groups = df.groupby('boro', observed=True) if by_boro else [(None, df)]
+    for boro, rows in groups:
+        directory = os.path.join(year_dir, f'boro={quote(str(boro))}') if by_boro else year_dir
+        os.makedirs(directory, exist_ok=True)
+        rows = rows.drop(columns=['boro']) if by_boro else rows
+        rows.to_parquet(os.path.join(directory, f'part-{part:05d}.parquet'), index=False)
+
+# Function to split a frame by inspection year and write each year as its own partition.
+def write_partitions(df, years, root=DATASET_ROOT, by_boro=False, pushdown=None):
+    df = coerce_to_schema(df)
+    row_years = df['inspection_date'].dt.year
+    for year in years:
+        write_year_partition(df[row_years == year], year, root, by_boro, pushdown)
+
+# Function to read a year range from the dataset, skipping partitions outside the range (and outside the
+# requested boroughs) without opening their files.
+def read_partitions(start_year, end_year, root=DATASET_ROOT, columns=None, boros=None):
+    years = [year for year in stored_years(root) if start_year <= year <= end_year]
+    paths = [os.path.join(root, f'{YEAR_COLUMN}={year}') for year in years]
+    paths = [path for path in paths if os.path.isdir(path)]
+    if not paths:
+        return coerce_to_schema(pd.DataFrame(columns=columns or list(SCHEMA)))
+
+    frames = []
+    for path in paths:
+        filters = [('boro', 'in', list(boros))] if boros else None
+
+        # Columns the API left out (null in every fetched row) are not in the files, and come back as nulls
+        available = pq.ParquetDataset(path).schema.names
+        file_columns = [column for column in columns if column in available] if columns else None
+        df = pd.read_parquet(path, columns=file_columns, filters=filters)
+        frames.append(df.drop(columns=[YEAR_COLUMN], errors='ignore'))
+
+    df = pd.concat(frames, ignore_index=True)
+    if columns:
+        df = df.reindex(columns=columns)
+
+    # Borough partitions come back as a partition key, so re-apply the schema for consistent dtypes
+    return coerce_to_schema(df)
+
+# Function to stream a year range from the dataset as DataFrames of at most `batch_size` rows, so callers
+# can process the whole history without holding it in memory.
+def iter_partitions(start_year, end_year, root=DATASET_ROOT, columns=None, batch_size=100_000):
+    for year in stored_years(root):
+        if not start_year <= year <= end_year:
+            continue
+
+        partition_dir = os.path.join(root, f'{YEAR_COLUMN}={year}')
+        for directory, _, files in sorted(os.walk(partition_dir)):
+            for name in sorted(files):
+                if not name.endswith('.parquet'):
+                    continue
+
+                parquet_file = pq.ParquetFile(os.path.join(directory, name))
+                file_columns = [c for c in columns if c in parquet_file.schema_arrow.names] if columns else None
+                for batch in parquet_file.iter_batches(batch_size=batch_size, columns=file_columns):
+                    df = batch.to_pandas()
+
+                    # Borough partition values live in the directory name rather than the file
+                    if 'boro' not in df.columns and (columns is None or 'boro' in columns):
+                        boro = os.path.basename(directory).partition('boro=')[2]
+                        if boro:
+                            df['boro'] = unquote(boro)
+                    yield coerce_to_schema(df)